@@ -0,0 +1,214 @@
+import multiprocessing
+import os
+import signal
+import threading
+from multiprocessing.managers import SyncManager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from queue import Empty
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import utils
+from job_result import JobResult
+from job_journal import JobJournal, STATE_DONE, STATE_FAILED
+
+# 进度回调: (文件索引, 该文件进度0-100, 总体进度0-100)
+BatchProgressCallback = Callable[[int, int, float], None]
+
+
+def _init_worker():
+    """子进程初始化: 忽略 Ctrl+C, 由主进程统一通过取消标志中止"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _init_process_worker(cv_threads: Optional[int]):
+    """处理进程初始化: 在 _init_worker 基础上限制 OpenCV 线程数"""
+    _init_worker()
+    if cv_threads:
+        import cv2
+        cv2.setNumThreads(cv_threads)
+
+
+def threads_per_worker(workers: int) -> Optional[int]:
+    """多个进程并行时每个进程分到的线程数, 单进程时为 None(不限制)"""
+    if workers <= 1:
+        return None
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def worker_options(options: dict, threads: Optional[int]) -> dict:
+    """
+    按每个进程分到的线程数限制编码线程和流水线效果线程,
+    避免每个进程都按全部核数开线程导致超额订阅; 配置中已显式指定的保持不变
+    """
+    if threads is None:
+        return options
+    options = dict(options)
+    if not options.get("encoder_threads"):
+        options["encoder_threads"] = threads
+    if not options.get("pipeline_workers"):
+        options["pipeline_workers"] = min(4, threads)
+    return options
+
+
+def _process_job(index: int, input_path: str, output_path: str, options: dict,
+                 progress_queue, cancel_event) -> Tuple[int, JobResult]:
+    """子进程入口: 处理单个视频并通过队列回报进度"""
+    if cancel_event.is_set():
+        return index, JobResult([input_path], output_path, options.get("seed")).cancel()
+
+    # 在子进程中才加载 OpenCV 等处理依赖, 主进程保持轻量
+    from video_processor import VideoProcessor
+    processor = VideoProcessor()
+    # 每个进程使用独立的临时目录, 避免并行时互相清理
+    processor.temp_dir = f"{processor.temp_dir}_{os.getpid()}"
+
+    last_progress = [-1]
+
+    def report(progress):
+        # 只在百分比变化时投递, 减少跨进程通信
+        if progress != last_progress[0]:
+            last_progress[0] = progress
+            progress_queue.put((index, progress))
+
+    result = processor.process_video(
+        input_path, output_path, options,
+        progress_callback=report,
+        cancel_event=cancel_event
+    )
+    return index, result
+
+
+class BatchProcessor:
+    """多进程批量处理调度器"""
+
+    def __init__(self, max_workers: Optional[int] = None, poll_interval: float = 0.2):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.poll_interval = poll_interval
+        self._cancel_requested = threading.Event()
+        self.skipped: List[int] = []
+
+    def cancel(self):
+        """请求取消批处理(可从其他线程调用)"""
+        self._cancel_requested.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def run(self, jobs: Sequence[Tuple[str, str]], options: dict,
+            progress_callback: Optional[BatchProgressCallback] = None,
+            journal: Optional[JobJournal] = None) -> List[JobResult]:
+        """
+        并行处理 (输入路径, 输出路径) 列表
+        返回与输入顺序一致的 JobResult 列表(布尔值为是否成功), 可用 job_result.summarize 汇总
+        传入任务日志时跳过日志中已完成的任务(索引记录在 self.skipped), 其余任务完成后写回状态
+        """
+        total = len(jobs)
+        seed = options.get("seed")
+        # 未开始即被取消的任务保持此默认结果
+        results = [JobResult([input_path], output_path, seed).cancel() for input_path, output_path in jobs]
+        self.skipped = []
+        if not total:
+            return results
+
+        self._cancel_requested.clear()
+        file_progress = [0] * total
+
+        template_hash = utils.options_fingerprint(options)
+        # 输出目录在提交前统一检查一次, 不可写的目录下的任务直接记为失败
+        writable: Dict[str, bool] = {}
+        remaining = []
+        for index, (input_path, output_path) in enumerate(jobs):
+            if journal is not None and journal.is_done(input_path, template_hash, output_path):
+                result = results[index] = JobResult([input_path], output_path, seed)
+                result.success = result.skipped = True
+                file_progress[index] = 100
+                self.skipped.append(index)
+                continue
+            output_dir = os.path.dirname(output_path)
+            if output_dir not in writable:
+                writable[output_dir] = utils.validate_output_dir(output_dir)
+            if writable[output_dir]:
+                remaining.append(index)
+            else:
+                results[index] = JobResult([input_path], output_path, seed).fail("输出目录不可写").finish()
+                file_progress[index] = 100
+        if not remaining:
+            return results
+        if journal is not None:
+            journal.mark_pending([jobs[index] for index in remaining], template_hash)
+
+        # 界面进程中已有多个线程(缩略图、元信息、预览), fork 出的子进程可能卡在 fork 时被持有的锁上,
+        # 子进程一律以 spawn 方式启动
+        context = multiprocessing.get_context("spawn")
+        # 管理进程同样忽略 Ctrl+C, 保证取消时进度队列仍可用
+        manager = SyncManager(ctx=context)
+        manager.start(_init_worker)
+        with manager:
+            progress_queue = manager.Queue()
+            cancel_event = manager.Event()
+
+            workers = min(self.max_workers, len(remaining))
+            threads = threads_per_worker(workers)
+            job_options = worker_options(options, threads)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_process_worker, initargs=(threads,)) as executor:
+                future_index: Dict = {}
+                for index in remaining:
+                    input_path, output_path = jobs[index]
+                    future = executor.submit(
+                        _process_job, index, input_path, output_path,
+                        job_options, progress_queue, cancel_event
+                    )
+                    future_index[future] = index
+
+                pending = set(future_index)
+                while pending:
+                    if self._cancel_requested.is_set() and not cancel_event.is_set():
+                        # 通知运行中的进程中止, 并撤销尚未开始的任务
+                        cancel_event.set()
+                        for future in pending:
+                            future.cancel()
+
+                    done, pending = wait(pending, timeout=self.poll_interval,
+                                         return_when=FIRST_COMPLETED)
+                    self._drain_progress(progress_queue, file_progress, progress_callback)
+
+                    for future in done:
+                        index = future_index[future]
+                        if future.cancelled():
+                            continue
+                        input_path, output_path = jobs[index]
+                        try:
+                            _, results[index] = future.result()
+                        except Exception as e:
+                            # 子进程异常退出等情况
+                            print(f"批处理任务失败 {os.path.basename(input_path)}: {str(e)}")
+                            results[index] = JobResult([input_path], output_path, seed).fail(
+                                f"{type(e).__name__}: {str(e)}"
+                            )
+                        result = results[index]
+                        # 因取消而中止的任务保持待处理状态, 下次运行继续
+                        if journal is not None and (result or not cancel_event.is_set()):
+                            journal.mark(input_path, template_hash, output_path,
+                                         STATE_DONE if result else STATE_FAILED, result.error)
+                        file_progress[index] = 100
+                        if progress_callback:
+                            progress_callback(index, 100, sum(file_progress) / total)
+
+            self._drain_progress(progress_queue, file_progress, progress_callback)
+
+        return results
+
+    def _drain_progress(self, progress_queue, file_progress: List[int],
+                        progress_callback: Optional[BatchProgressCallback]):
+        """取出队列中所有进度消息并回调"""
+        total = len(file_progress)
+        while True:
+            try:
+                index, progress = progress_queue.get_nowait()
+            except (Empty, EOFError, OSError):
+                break
+            file_progress[index] = max(file_progress[index], min(progress, 100))
+            if progress_callback:
+                progress_callback(index, file_progress[index], sum(file_progress) / total)
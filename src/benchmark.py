@@ -0,0 +1,325 @@
+"""
+性能基准测试
+
+在本地生成不同分辨率、不同 GOP 长度的合成测试视频, 测量:
+  - 各效果单帧耗时(µs/帧)
+  - process_video 端到端帧率、峰值内存、编码占比
+结果保存为 JSON, 可用 --compare 与之前的结果对比。
+
+示例:
+    python benchmark.py --sizes 480p 1080p 4k --gops 12 250 --output bench.json
+    python benchmark.py --compare bench_old.json --output bench_new.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import utils
+import video_io
+import frame_plan
+import presets
+
+cv2 = utils.lazy_import("cv2")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESOLUTIONS = {
+    "480p": (854, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+DEFAULT_SIZES = ("480p", "1080p")
+DEFAULT_GOPS = (12, 250)
+DEFAULT_FPS = 30
+# 使用默认配置, 固定种子并关闭结果缓存以保证每次测量相同的工作量
+BENCH_OPTIONS = dict(presets.DEFAULT_OPTIONS, seed=42, result_cache=False)
+# 对比时耗时增加超过该比例视为退化
+REGRESSION_THRESHOLD = 0.10
+
+
+def generate_video(size_name: str, gop: int, seconds: float, bench_dir: str) -> str:
+    """生成(或复用已生成的)合成测试视频"""
+    width, height = RESOLUTIONS[size_name]
+    path = os.path.join(bench_dir, f"bench_{size_name}_gop{gop}_{seconds:g}s.mp4")
+    if os.path.exists(path):
+        return path
+
+    ffmpeg_path = video_io.get_ffmpeg_exe()
+    if ffmpeg_path:
+        # testsrc2 带运动和色彩变化, 更接近真实素材的编码负载
+        cmd = [
+            ffmpeg_path, "-v", "error", "-y",
+            "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={DEFAULT_FPS}",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", f"{seconds:g}", "-c:v", "libx264", "-preset", "veryfast",
+            "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+            "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path
+        ]
+        subprocess.run(cmd, check=True)
+    else:
+        # 无 ffmpeg 时用 OpenCV 生成(无法控制 GOP)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), DEFAULT_FPS, (width, height))
+        yy, xx = np.mgrid[0:height, 0:width]
+        for index in range(int(seconds * DEFAULT_FPS)):
+            frame = np.empty((height, width, 3), dtype=np.uint8)
+            frame[..., 0] = (xx + index * 4) % 256
+            frame[..., 1] = (yy + index * 2) % 256
+            frame[..., 2] = (xx + yy) % 256
+            writer.write(frame)
+        writer.release()
+    return path
+
+
+def read_frames(path: str, count: int) -> List[np.ndarray]:
+    cap = cv2.VideoCapture(path)
+    frames = []
+    try:
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+
+def time_per_frame(func, frames: List[np.ndarray], rounds: int = 3) -> float:
+    """多轮测量取中位数, 返回 µs/帧"""
+    func(frames[0])  # 预热(查找表、CLAHE 对象等)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for frame in frames:
+            func(frame)
+        samples.append((time.perf_counter() - start) / len(frames))
+    return round(statistics.median(samples) * 1e6, 1)
+
+
+def bench_effects(frames: List[np.ndarray], rounds: int = 3) -> Dict[str, float]:
+    """各效果单帧耗时(写入预分配缓冲区, 与处理流程一致)"""
+    from video_processor import VideoProcessor
+    processor = VideoProcessor()
+    height, width = frames[0].shape[:2]
+    dst = np.empty_like(frames[0])
+    box = (int(width * 0.05), int(height * 0.05), int(width * 0.9), int(height * 0.9))
+
+    results = {
+        "crop": time_per_frame(lambda f: processor.apply_crop(f, box=box, dst=dst), frames, rounds),
+        "mirror": time_per_frame(lambda f: processor.apply_mirror(f, dst=dst), frames, rounds),
+        "shake": time_per_frame(lambda f: processor.apply_shake(f, offset=(5, -3), dst=dst), frames, rounds),
+    }
+    for filter_type in frame_plan.FILTER_TYPES:
+        results[f"filter_{filter_type}"] = time_per_frame(
+            lambda f, t=filter_type: processor.apply_filter(f, t, hsv_shift=(10, 20), dst=dst), frames, rounds
+        )
+
+    # 变速/抽帧在处理计划中完成, 测量生成计划的单帧开销
+    rng_options = dict(BENCH_OPTIONS, framedrop=True)
+    plan_frames = 100000
+    start = time.perf_counter()
+    frame_plan.build_effect_plan(plan_frames, (width, height), rng_options, seed=1)
+    results["speed_plan"] = round((time.perf_counter() - start) / plan_frames * 1e6, 3)
+    return results
+
+
+class TimedWriter:
+    """统计写入与收尾阻塞时间的输出后端包装"""
+
+    def __init__(self, writer):
+        self._writer = writer
+        self.seconds = 0.0
+        self.frames = 0
+
+    def write(self, frame):
+        start = time.perf_counter()
+        self._writer.write(frame)
+        self.seconds += time.perf_counter() - start
+        self.frames += 1
+
+    def release(self):
+        start = time.perf_counter()
+        self._writer.release()
+        self.seconds += time.perf_counter() - start
+
+
+def _cpu_seconds(who) -> float:
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _run_end_to_end(video_path: str, output_path: str, options: dict) -> dict:
+    """在独立子进程中运行一次 process_video, 使峰值内存互不影响"""
+    from video_processor import VideoProcessor
+
+    writers = []
+    create_writer = video_io.create_writer
+
+    def timed_create_writer(*args, **kwargs):
+        writer = TimedWriter(create_writer(*args, **kwargs))
+        writers.append(writer)
+        return writer
+
+    video_io.create_writer = timed_create_writer
+    processor = VideoProcessor()
+    processor.temp_dir = f"{processor.temp_dir}_bench_{os.getpid()}"
+
+    start = time.perf_counter()
+    success = processor.process_video(video_path, output_path, options)
+    seconds = time.perf_counter() - start
+
+    frames = sum(writer.frames for writer in writers)
+    result = {
+        "success": bool(success),
+        "frames": frames,
+        "seconds": round(seconds, 3),
+        "fps": round(frames / seconds, 2) if seconds else 0.0,
+        # 主进程阻塞在编码器上的时间占比
+        "encode_wait_share": round(sum(writer.seconds for writer in writers) / seconds, 3) if seconds else 0.0,
+    }
+    if resource is not None:
+        self_cpu = _cpu_seconds(resource.RUSAGE_SELF)
+        child_cpu = _cpu_seconds(resource.RUSAGE_CHILDREN)
+        # ffmpeg 编码进程占总 CPU 时间的比例
+        result["encode_cpu_share"] = round(child_cpu / (self_cpu + child_cpu), 3) if self_cpu + child_cpu else 0.0
+        # Linux 下 ru_maxrss 单位为 KB, macOS 为字节
+        scale = 1 if sys.platform == "darwin" else 1024
+        result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20, 1)
+        result["encoder_peak_rss_mb"] = round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 2 ** 20, 1
+        )
+    try:
+        os.remove(output_path)
+    except OSError:
+        pass
+    return result
+
+
+def bench_end_to_end(video_path: str, options: dict) -> dict:
+    output_path = os.path.splitext(video_path)[0] + "_out.mp4"
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_run_end_to_end, (video_path, output_path, options))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, gops, seconds: float, effect_frames: int, rounds: int,
+                   end_to_end: bool, bench_dir: str, options: dict) -> dict:
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "options": options,
+        },
+        "effects": {},
+        "end_to_end": {},
+    }
+    for size_name in sizes:
+        for gop in gops:
+            video_path = generate_video(size_name, gop, seconds, bench_dir)
+            if size_name not in report["effects"]:
+                print(f"[效果] {size_name} ...", file=sys.stderr)
+                report["effects"][size_name] = bench_effects(read_frames(video_path, effect_frames), rounds)
+            if end_to_end:
+                case = f"{size_name}_gop{gop}"
+                print(f"[端到端] {case} ...", file=sys.stderr)
+                report["end_to_end"][case] = bench_end_to_end(video_path, options)
+    return report
+
+
+def compare(current: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """对比两次结果, 返回可读的对比行; 退化的项目以 ! 标记"""
+    lines = []
+    for size_name, effects in current.get("effects", {}).items():
+        old_effects = baseline.get("effects", {}).get(size_name, {})
+        for name, value in effects.items():
+            old = old_effects.get(name)
+            if old:
+                ratio = value / old
+                mark = "!" if ratio > 1 + threshold else " "
+                lines.append(f"{mark} {size_name:>6} {name:<20} {old:>10.1f} -> {value:>10.1f} µs/帧 ({ratio:.2f}x)")
+    for case, result in current.get("end_to_end", {}).items():
+        old = baseline.get("end_to_end", {}).get(case, {}).get("fps")
+        if old and result.get("fps"):
+            ratio = result["fps"] / old
+            mark = "!" if ratio < 1 - threshold else " "
+            lines.append(f"{mark} {case:<27} {old:>10.2f} -> {result['fps']:>10.2f} fps ({ratio:.2f}x)")
+    return lines
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="批量自动剪辑工具 - 性能基准测试")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), choices=sorted(RESOLUTIONS),
+                        help="测试分辨率(默认: 480p 1080p)")
+    parser.add_argument("--gops", nargs="+", type=int, default=list(DEFAULT_GOPS), help="GOP 长度(默认: 12 250)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="测试视频时长(默认: 5 秒)")
+    parser.add_argument("--effect-frames", type=int, default=30, help="效果测试使用的帧数")
+    parser.add_argument("--rounds", type=int, default=3, help="效果测试轮数, 取中位数")
+    parser.add_argument("--effects-only", action="store_true", help="只测试效果, 跳过端到端")
+    parser.add_argument("--pipeline", choices=("on", "off"), default="on", help="端到端是否使用流水线")
+    parser.add_argument("--backend", choices=("ffmpeg", "opencv"), default=video_io.DEFAULT_BACKEND)
+    parser.add_argument("--bench-dir", default=None, help="测试视频目录(默认: 缓存目录下的 bench)")
+    parser.add_argument("-o", "--output", default=None, help="结果 JSON 路径(默认输出到 stdout)")
+    parser.add_argument("--compare", default=None, help="与之前的结果 JSON 对比, 有退化时退出码为 1")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="判定退化的变化比例(默认: 0.10)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    bench_dir = args.bench_dir or os.path.join(utils.get_cache_dir(), "bench")
+    os.makedirs(bench_dir, exist_ok=True)
+
+    options = dict(BENCH_OPTIONS, pipeline=args.pipeline == "on", backend=args.backend)
+    report = run_benchmarks(args.sizes, args.gops, args.seconds, args.effect_frames, args.rounds,
+                            not args.effects_only, bench_dir, options)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines = compare(report, baseline, args.threshold)
+        for line in lines:
+            print(line, file=sys.stderr)
+        if any(line.startswith("!") for line in lines):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import cv2
+import numpy as np
+from typing import Optional
+
+import color_grading
+import frame_buffers
+
+
+def ensure_buffer(out: Optional[np.ndarray], shape, dtype=np.uint8) -> np.ndarray:
+    """复用形状一致的输出缓冲区, 否则重新分配"""
+    if out is None or out.shape != tuple(shape) or out.dtype != dtype:
+        return np.empty(shape, dtype=dtype)
+    return out
+
+
+class BlockBuffers:
+    """按名称缓存块处理中间缓冲区, 形状变化时才重新分配"""
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name: str, shape, dtype=np.uint8) -> np.ndarray:
+        buffer = ensure_buffer(self._buffers.get(name), shape, dtype)
+        self._buffers[name] = buffer
+        return buffer
+
+
+def iter_blocks(frames, block_size: int):
+    """
+    将 (源帧序号, 帧) 流按 block_size 打包为 (N, H, W, 3) 帧块
+    产出 (块内最后一帧的源帧序号, 帧块)
+    """
+    pending = []
+    frame_index = -1
+    for frame_index, frame in frames:
+        pending.append(frame)
+        if len(pending) == block_size:
+            yield frame_index, np.stack(pending)
+            pending = []
+    if pending:
+        yield frame_index, np.stack(pending)
+
+
+def _as_rows(block: np.ndarray) -> np.ndarray:
+    """把 (N, H, W, 3) 帧块视作一张 (N*H, W, 3) 的图像, 不复制数据"""
+    n, h, w, c = block.shape
+    return block.reshape(n * h, w, c)
+
+
+def crop_resize_block(block: np.ndarray, boxes: np.ndarray, out: Optional[np.ndarray] = None,
+                      mirror: Optional[np.ndarray] = None) -> np.ndarray:
+    """按每帧的裁剪框裁剪并缩放回原尺寸(可选逐帧镜像), 结果写入 out"""
+    out = ensure_buffer(out, block.shape)
+    for i, box in enumerate(boxes):
+        frame_buffers.crop_scale_mirror(block[i], box, mirror is not None and mirror[i], dst=out[i])
+    return out
+
+
+def gaussian_block(block: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """高斯模糊(逐帧处理以免跨帧边界取样)"""
+    out = ensure_buffer(out, block.shape)
+    for i in range(len(block)):
+        cv2.GaussianBlur(block[i], (5, 5), 0, dst=out[i])
+    return out
+
+
+def sepia_block(block: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """棕褐色滤镜, 整个帧块一次矩阵变换"""
+    out = ensure_buffer(out, block.shape)
+    color_grading.apply_sepia(_as_rows(block), dst=_as_rows(out))
+    return out
+
+
+def contrast_block(block: np.ndarray, out: Optional[np.ndarray] = None,
+                   buffers: Optional[BlockBuffers] = None) -> np.ndarray:
+    """CLAHE 对比度增强, 颜色空间转换整块进行, CLAHE 按帧进行"""
+    out = ensure_buffer(out, block.shape)
+    buffers = buffers or BlockBuffers()
+    lab = buffers.get("lab", block.shape)
+    cv2.cvtColor(_as_rows(block), cv2.COLOR_BGR2LAB, dst=_as_rows(lab))
+    clahe = color_grading.get_clahe()
+    for i in range(len(lab)):
+        lab[i, :, :, 0] = clahe.apply(np.ascontiguousarray(lab[i, :, :, 0]))
+    cv2.cvtColor(_as_rows(lab), cv2.COLOR_LAB2BGR, dst=_as_rows(out))
+    return out
+
+
+def hsv_shift_block(block: np.ndarray, shifts: np.ndarray, out: Optional[np.ndarray] = None,
+                    buffers: Optional[BlockBuffers] = None) -> np.ndarray:
+    """
+    HSV 偏移, shifts 为每帧的 (色相偏移, 饱和度偏移)
+    颜色空间转换整块进行, 偏移通过查找表完成
+    """
+    out = ensure_buffer(out, block.shape)
+    buffers = buffers or BlockBuffers()
+    hsv = buffers.get("hsv", block.shape)
+    cv2.cvtColor(_as_rows(block), cv2.COLOR_BGR2HSV, dst=_as_rows(hsv))
+
+    shifts = np.asarray(shifts).reshape(-1, 2)
+    if len(np.unique(shifts, axis=0)) == 1:
+        cv2.LUT(_as_rows(hsv), color_grading.hsv_shift_lut(*map(int, shifts[0])), dst=_as_rows(hsv))
+    else:
+        for i, (hue_shift, sat_shift) in enumerate(shifts):
+            cv2.LUT(hsv[i], color_grading.hsv_shift_lut(int(hue_shift), int(sat_shift)), dst=hsv[i])
+
+    cv2.cvtColor(_as_rows(hsv), cv2.COLOR_HSV2BGR, dst=_as_rows(out))
+    return out
+
+
+def apply_filter_block(block: np.ndarray, filter_type: str, hsv_shifts=None,
+                       out: Optional[np.ndarray] = None,
+                       buffers: Optional[BlockBuffers] = None) -> np.ndarray:
+    """对整个帧块应用同一种滤镜"""
+    if filter_type == "gaussian":
+        return gaussian_block(block, out)
+    elif filter_type == "sepia":
+        return sepia_block(block, out)
+    elif filter_type == "contrast":
+        return contrast_block(block, out, buffers)
+    elif filter_type == "hsv_shift":
+        if hsv_shifts is None:
+            hsv_shifts = np.zeros((len(block), 2), dtype=np.int16)
+        return hsv_shift_block(block, hsv_shifts, out, buffers)
+    out = ensure_buffer(out, block.shape)
+    out[...] = block
+    return out
@@ -0,0 +1,238 @@
+"""
+无界面批量处理入口, 供服务器/定时任务调用
+
+示例:
+    python cli.py videos/ "more/*.mp4" --preset 高级去重 --output-dir output --workers 16 --json
+
+加 --profile-imports 可在退出时输出各模块导入耗时
+"""
+import sys
+import import_profiler
+
+if import_profiler.requested(sys.argv):
+    import_profiler.enable()
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import signal
+import time
+from typing import List, Optional
+
+import utils
+import result_cache
+import job_result
+import output_profiles
+import presets
+from batch_engine import BatchProcessor
+from job_journal import JobJournal, default_journal_path
+from template_manager import TemplateManager
+
+# 退出码
+EXIT_OK = 0
+EXIT_FAILED = 1          # 部分或全部文件处理失败
+EXIT_USAGE = 2           # 参数错误
+EXIT_NO_INPUT = 3        # 没有找到可处理的视频
+EXIT_CANCELLED = 130     # 被信号中断
+
+
+def collect_inputs(patterns: List[str]) -> List[str]:
+    """展开通配符与文件夹, 返回去重后的视频文件列表(保持发现顺序)"""
+    found = []
+    seen = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) or [pattern]
+        for match in sorted(matches):
+            if os.path.isdir(match):
+                candidates = []
+                for root, _, files in os.walk(match):
+                    candidates.extend(
+                        os.path.join(root, name) for name in files
+                        if name.lower().endswith(utils.VIDEO_EXTENSIONS)
+                    )
+                candidates.sort()
+            elif os.path.isfile(match) and match.lower().endswith(utils.VIDEO_EXTENSIONS):
+                candidates = [match]
+            else:
+                continue
+            for path in candidates:
+                key = os.path.realpath(path)
+                if key not in seen:
+                    seen.add(key)
+                    found.append(path)
+    return found
+
+
+def load_options(template: Optional[str], template_dir: str, preset: Optional[str] = None) -> dict:
+    """
+    按模板名、JSON 文件或 JSON 字符串加载处理配置
+    preset: 内置预设名称, 作为模板之下的基础配置; 未指定时使用默认配置
+    """
+    options = presets.preset_options(preset) if preset else dict(presets.DEFAULT_OPTIONS)
+    if not template:
+        return options
+
+    if template.lstrip().startswith("{"):
+        config = json.loads(template)
+    elif template.endswith(".json") and os.path.isfile(template):
+        with open(template, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    else:
+        config = TemplateManager(template_dir).load_template(template)
+        if not config:
+            raise ValueError(f"模板不存在或为空: {template}")
+    options.update(config)
+    return options
+
+
+class ProgressReporter:
+    """进度输出: JSON 行或可读文本"""
+
+    def __init__(self, jobs, as_json: bool, stream=sys.stdout):
+        self.jobs = jobs
+        self.as_json = as_json
+        self.stream = stream
+        self._last_overall = -1
+
+    def emit(self, event: str, **fields):
+        if self.as_json:
+            record = {"event": event, "time": round(time.time(), 3)}
+            record.update(fields)
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            details = ", ".join(f"{key}={value}" for key, value in fields.items())
+            self.stream.write(f"[{event}] {details}\n")
+        self.stream.flush()
+
+    def progress(self, index: int, file_progress: int, overall: float):
+        if file_progress >= 100:
+            return
+        overall = int(overall)
+        # 文本模式下只在总体进度变化时输出
+        if not self.as_json and overall == self._last_overall:
+            return
+        self._last_overall = overall
+        self.emit("progress", index=index, input=self.jobs[index][0],
+                  progress=file_progress, overall=overall)
+
+
+def positive_int(value: str) -> int:
+    """argparse 类型: 不小于 1 的整数"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"需要整数: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须不小于 1: {value}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="批量自动剪辑工具 - 命令行批处理")
+    parser.add_argument("inputs", nargs="+", help="输入视频文件、文件夹或通配符")
+    parser.add_argument("-p", "--preset", choices=list(presets.PRESETS), default=None,
+                        help="内置去重预设(默认: 初级去重), 与 --template 同时指定时模板中的设置优先")
+    parser.add_argument("-t", "--template", help="模板名称、模板 JSON 文件路径或 JSON 字符串")
+    parser.add_argument("--template-dir", default="templates", help="模板目录(默认: templates)")
+    parser.add_argument("-o", "--output-dir", default="output", help="输出目录(默认: output)")
+    parser.add_argument("-w", "--workers", type=positive_int, default=None, help="并行进程数(默认: CPU 核数)")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子, 覆盖模板中的设置")
+    parser.add_argument("--profile", choices=list(output_profiles.PROFILES), default=None,
+                        help="输出规格, 覆盖模板中的设置")
+    parser.add_argument("--json", action="store_true", help="以 JSON 行格式输出进度与结果")
+    parser.add_argument("--journal", default=None,
+                        help="任务日志路径(默认: 输出目录下的 .autovideoeditor_jobs.sqlite)")
+    parser.add_argument("--no-resume", action="store_true", help="不跳过任务日志中已完成的文件")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        options = load_options(args.template, args.template_dir, args.preset)
+    except (ValueError, OSError) as e:
+        print(f"加载模板失败: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if args.seed is not None:
+        options["seed"] = args.seed
+    if args.workers is not None:
+        options["workers"] = args.workers
+    if args.profile is not None:
+        options["output_profile"] = args.profile
+
+    if not utils.validate_output_dir(args.output_dir):
+        return EXIT_USAGE
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("没有找到可处理的视频文件", file=sys.stderr)
+        return EXIT_NO_INPUT
+
+    # 输出名由输入和配置决定, 中断后重新运行可与任务日志对应
+    suffix = f"_{options.get('preset', 'processed')}"
+    jobs = [
+        (path, utils.generate_output_filename(path, args.output_dir, suffix=suffix, options=options))
+        for path in inputs
+    ]
+    stream = sys.stdout
+    if args.json:
+        # stdout 只保留 JSON 行; 本进程及工作进程的其他 print 输出转到 stderr
+        stream = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+        sys.stdout.flush()
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    reporter = ProgressReporter(jobs, args.json, stream)
+    batch = BatchProcessor(max_workers=options.get("workers"))
+
+    # 收到中断/终止信号时取消批处理
+    def handle_signal(signum, frame):
+        batch.cancel()
+    signal.signal(signal.SIGINT, handle_signal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handle_signal)
+
+    reporter.emit("start", total=len(jobs), workers=batch.max_workers, output_dir=args.output_dir)
+    start_time = time.time()
+    journal = None
+    if not args.no_resume:
+        journal = JobJournal(args.journal or default_journal_path(args.output_dir))
+    try:
+        results = batch.run(jobs, options, progress_callback=reporter.progress, journal=journal)
+    finally:
+        if journal is not None:
+            journal.close()
+
+    elapsed = time.time() - start_time
+
+    for (input_path, output_path), result in zip(jobs, results):
+        reporter.emit("file", input=input_path, output=output_path, success=result.success,
+                      skipped=result.skipped, cache_hit=result.cache_hit, error=result.error,
+                      frames_out=result.frames_out, frames_dropped=result.frames_dropped,
+                      bytes=result.bytes_written, seconds=round(result.wall_seconds, 3),
+                      fps=round(result.fps, 2))
+
+    report = job_result.summarize(results, elapsed)
+    cache_report = None
+    cache = result_cache.default_cache() if options.get("result_cache", True) else None
+    if cache is not None:
+        # 命中/未命中只统计本次运行的任务; 缓存自身的计数器跨运行累计
+        cache_report = cache.stats()
+        cache_report["hits"] = report["cache_hits"]
+        cache_report["misses"] = sum(1 for result in results
+                                     if not result.skipped and not result.cache_hit and not result.cancelled)
+    reporter.emit("summary", total=len(jobs), succeeded=report["succeeded"],
+                  failed=len(jobs) - report["succeeded"], skipped=report["skipped"],
+                  cancelled=batch.cancelled, result_cache=cache_report,
+                  elapsed=round(elapsed, 3), report=report)
+
+    if batch.cancelled:
+        return EXIT_CANCELLED
+    return EXIT_OK if report["succeeded"] == len(jobs) else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
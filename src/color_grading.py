@@ -0,0 +1,60 @@
+import threading
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 棕褐色滤镜矩阵(BGR)
+SEPIA_MATRIX = np.array([[0.272, 0.534, 0.131],
+                         [0.349, 0.686, 0.168],
+                         [0.393, 0.769, 0.189]], dtype=np.float32)
+
+# CLAHE 对象不是线程安全的, 每个线程单独缓存
+_local = threading.local()
+
+
+@lru_cache(maxsize=1024)
+def hsv_shift_lut(hue_shift: int, sat_shift: int) -> np.ndarray:
+    """生成并缓存 HSV 三通道查找表: 色相循环偏移, 饱和度截断偏移, 明度不变"""
+    values = np.arange(256, dtype=np.int16)
+    lut = np.empty((1, 256, 3), dtype=np.uint8)
+    lut[0, :, 0] = (values + hue_shift) % 180
+    lut[0, :, 1] = np.clip(values + sat_shift, 0, 255)
+    lut[0, :, 2] = values
+    lut.setflags(write=False)
+    return lut
+
+
+def get_clahe(clip_limit: float = 2.0, tile_grid: Tuple[int, int] = (8, 8)):
+    """获取当前线程中按参数缓存的 CLAHE 实例"""
+    cache = getattr(_local, "clahe", None)
+    if cache is None:
+        cache = _local.clahe = {}
+    key = (clip_limit, tuple(tile_grid))
+    clahe = cache.get(key)
+    if clahe is None:
+        clahe = cache[key] = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tuple(tile_grid))
+    return clahe
+
+
+def apply_sepia(frame: np.ndarray, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """棕褐色滤镜"""
+    return cv2.transform(frame, SEPIA_MATRIX, dst=dst)
+
+
+def apply_contrast(frame: np.ndarray, dst: Optional[np.ndarray] = None,
+                   clip_limit: float = 2.0, tile_grid: Tuple[int, int] = (8, 8)) -> np.ndarray:
+    """CLAHE 增强 LAB 空间亮度通道"""
+    lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+    lightness = get_clahe(clip_limit, tile_grid).apply(cv2.extractChannel(lab, 0))
+    cv2.insertChannel(lightness, lab, 0)
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=dst)
+
+
+def apply_hsv_shift(frame: np.ndarray, hue_shift: int, sat_shift: int,
+                    dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """HSV 偏移, 偏移本身只需一次查表"""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    cv2.LUT(hsv, hsv_shift_lut(int(hue_shift), int(sat_shift)), dst=hsv)
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=dst)
@@ -1,16 +1,25 @@
 import sys
 import os
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QFileDialog, QListWidgetItem,
-                             QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget,
+import threading
+import time
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QFileDialog, QAbstractItemView,
+                             QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListView,
                              QPushButton, QGroupBox, QComboBox, QCheckBox, QProgressBar,
-                             QStackedWidget, QTabWidget, QSpinBox, QDoubleSpinBox)
-from PyQt5.QtCore import Qt, QTimer, QSize
-from PyQt5.QtGui import QIcon, QPixmap, QImage
-import cv2
-import numpy as np
-from video_processor import VideoProcessor
+                             QStackedWidget, QTabWidget, QSpinBox, QDoubleSpinBox,
+                             QInputDialog, QLineEdit, QMessageBox)
+from PyQt5.QtCore import Qt, QTimer, QSize, QThread, pyqtSignal
+from PyQt5.QtGui import QIcon, QPixmap
+from batch_engine import BatchProcessor
+from job_journal import JobJournal, default_journal_path
+from job_result import JobResult, summarize
+import output_profiles
+import presets
 from template_manager import TemplateManager
 import utils
+from file_list_model import VideoListModel
+from folder_scanner import iter_video_batches
+from thumbnail_cache import ThumbnailCache
+from preview_engine import PreviewEngine
 
 class AutoVideoEditor(QMainWindow):
     def __init__(self):
@@ -23,17 +32,29 @@ class AutoVideoEditor(QMainWindow):
         if os.path.exists(icon_path):
             self.setWindowIcon(QIcon(icon_path))
         
-        # 初始化UI
-        self.initUI()
-        
-        # 初始化变量
+        # 初始化变量(界面构建时会用到, 需先于 initUI)
         self.current_file_index = -1
-        self.video_files = []
-        self.preview_image = None
-        self.video_processor = VideoProcessor()
+        self.file_model = VideoListModel(self)
+        self.scan_worker = None
+        self.batch_worker = None
+        self.preview_image = None  # 当前预览图(缩略图或实时预览帧), 窗口缩放时以此重新缩放
+        self.thumbnails = ThumbnailCache()
+        self.thumbnails.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.preview_engine = PreviewEngine(parent=self)
+        self.preview_engine.frame_ready.connect(self.on_preview_frame)
+        # 参数连续变化时合并为一次预览刷新
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(150)
+        self.preview_timer.timeout.connect(self.refresh_live_preview)
+        self.video_processor = None  # 首次处理时再加载, 加快启动
         self.template_manager = TemplateManager()
         self.output_dir = os.path.join(os.getcwd(), "output")
         
+        # 初始化UI
+        self.initUI()
+        self.connect_preview_signals()
+        
         # 设置样式
         self.setStyleSheet("""
             QMainWindow {
@@ -52,7 +73,7 @@ class AutoVideoEditor(QMainWindow):
                 left: 10px;
                 padding: 0 5px;
             }
-            QListWidget {
+            QListView {
                 background-color: #34495e;
                 border: none;
                 border-radius: 5px;
@@ -101,9 +122,13 @@ class AutoVideoEditor(QMainWindow):
         left_panel.setLayout(left_layout)
         
         # 文件列表
-        self.file_list = QListWidget()
+        self.file_list = QListView()
+        self.file_list.setModel(self.file_model)
         self.file_list.setMinimumHeight(400)
-        self.file_list.itemSelectionChanged.connect(self.on_file_selected)
+        # 行高一致时视图无需逐行计算尺寸, 大列表滚动更流畅
+        self.file_list.setUniformItemSizes(True)
+        self.file_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.file_list.selectionModel().selectionChanged.connect(self.on_file_selected)
         left_layout.addWidget(self.file_list)
         
         # 文件操作按钮
@@ -152,6 +177,10 @@ class AutoVideoEditor(QMainWindow):
         self.preview_label.setStyleSheet("background-color: #34495e; border-radius: 5px;")
         left_layout.addWidget(self.preview_label)
         
+        self.live_preview_check = QCheckBox("实时预览效果")
+        self.live_preview_check.toggled.connect(self.load_preview)
+        left_layout.addWidget(self.live_preview_check)
+        
         # 中间面板 - 预览和处理
         middle_panel = QGroupBox("预览和处理")
         middle_layout = QVBoxLayout()
@@ -176,6 +205,12 @@ class AutoVideoEditor(QMainWindow):
         self.process_all_btn.setEnabled(False)
         self.process_all_btn.clicked.connect(self.process_all)
         process_layout.addWidget(self.process_all_btn)
+        
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.setIcon(QIcon("icons/cancel.png" if os.path.exists("icons/cancel.png") else ""))
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_batch)
+        process_layout.addWidget(self.cancel_btn)
         info_layout.addLayout(process_layout)
         middle_layout.addLayout(info_layout)
         
@@ -198,7 +233,7 @@ class AutoVideoEditor(QMainWindow):
         preset_layout = QHBoxLayout()
         preset_layout.addWidget(QLabel("预设方案:"))
         self.preset_combo = QComboBox()
-        self.preset_combo.addItems(["初级去重", "中级去重", "高级去重", "自定义"])
+        self.preset_combo.addItems(list(presets.PRESETS) + ["自定义"])
         self.preset_combo.currentIndexChanged.connect(self.load_preset)
         preset_layout.addWidget(self.preset_combo)
         dedupe_layout.addLayout(preset_layout)
@@ -235,6 +270,10 @@ class AutoVideoEditor(QMainWindow):
         self.framedrop_check = QCheckBox("抽帧快剪")
         adv_layout.addWidget(self.framedrop_check)
         
+        self.pipeline_check = QCheckBox("流水线加速")
+        self.pipeline_check.setChecked(True)
+        adv_layout.addWidget(self.pipeline_check)
+        
         self.combo_label = QLabel("合成方式:")
         adv_layout.addWidget(self.combo_label)
         
@@ -273,8 +312,52 @@ class AutoVideoEditor(QMainWindow):
         self.speed_max_spin.setValue(1.1)
         self.speed_max_spin.setSingleStep(0.1)
         speed_layout.addWidget(self.speed_max_spin)
+        
+        # 恒定: 整段取范围内的一个速度; 渐变: 速度在范围内逐渐变化
+        self.speed_curve_combo = QComboBox()
+        self.speed_curve_combo.addItem("恒定", "constant")
+        self.speed_curve_combo.addItem("渐变", "ramp")
+        speed_layout.addWidget(self.speed_curve_combo)
         params_layout.addLayout(speed_layout)
         
+        seed_layout = QHBoxLayout()
+        seed_layout.addWidget(QLabel("随机种子:"))
+        self.seed_spin = QSpinBox()
+        self.seed_spin.setRange(0, 2**31 - 1)
+        self.seed_spin.setSpecialValueText("随机")
+        seed_layout.addWidget(self.seed_spin)
+        params_layout.addLayout(seed_layout)
+        
+        encode_layout = QHBoxLayout()
+        encode_layout.addWidget(QLabel("编码速度:"))
+        self.encoder_preset_combo = QComboBox()
+        self.encoder_preset_combo.addItems(["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow"])
+        self.encoder_preset_combo.setCurrentText("fast")
+        encode_layout.addWidget(self.encoder_preset_combo)
+        
+        encode_layout.addWidget(QLabel("画质(CRF):"))
+        self.crf_spin = QSpinBox()
+        self.crf_spin.setRange(0, 51)
+        self.crf_spin.setValue(23)
+        encode_layout.addWidget(self.crf_spin)
+        params_layout.addLayout(encode_layout)
+        
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("输出规格:"))
+        self.output_profile_combo = QComboBox()
+        self.output_profile_combo.addItems(list(output_profiles.PROFILES))
+        self.output_profile_combo.setToolTip("大于目标尺寸的视频在解码后即缩小, 效果与编码都按目标尺寸进行")
+        profile_layout.addWidget(self.output_profile_combo)
+        params_layout.addLayout(profile_layout)
+        
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("并行进程数:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.workers_spin.setValue(max(1, os.cpu_count() or 1))
+        workers_layout.addWidget(self.workers_spin)
+        params_layout.addLayout(workers_layout)
+        
         dedupe_layout.addWidget(params_group)
         
         # 混剪方案标签页
@@ -328,18 +411,38 @@ class AutoVideoEditor(QMainWindow):
             "视频文件 (*.mp4 *.avi *.mov *.mkv *.flv)"
         )
         if files:
-            self.video_files.extend(files)
-            self.update_file_list()
+            added = self.file_model.add_paths(files)
+            self.file_model.prefetch_info(added)
+            self.thumbnails.request(added)
+            self.update_buttons_state()
     
     def add_folder(self):
+        # 扫描进行中时该按钮用于停止扫描
+        if self.scan_worker is not None and self.scan_worker.isRunning():
+            self.scan_worker.cancel()
+            return
+        
         folder = QFileDialog.getExistingDirectory(self, "选择视频文件夹")
         if folder:
-            valid_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.flv')
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    if file.lower().endswith(valid_extensions):
-                        self.video_files.append(os.path.join(root, file))
-            self.update_file_list()
+            # 后台扫描, 边扫描边加入列表
+            self.scan_worker = FolderScanThread(folder)
+            self.scan_worker.batch_found.connect(self.on_scan_batch)
+            self.scan_worker.finished.connect(self.on_scan_finished)
+            self.add_folder_btn.setText("停止扫描")
+            self.scan_worker.start()
+    
+    def on_scan_batch(self, batch):
+        """文件夹扫描发现一批视频 [(路径, 真实路径), ...], 由列表模型按真实路径去重"""
+        paths, keys = zip(*batch)
+        added = self.file_model.add_paths(paths, keys)
+        # 新加入的文件批量预读元信息, 之后预览和处理直接命中缓存
+        self.file_model.prefetch_info(added)
+        self.thumbnails.request(added)
+        self.update_buttons_state()
+    
+    def on_scan_finished(self, completed):
+        """文件夹扫描结束(completed 为 False 表示被取消)"""
+        self.add_folder_btn.setText("添加文件夹")
     
     def browse_output(self):
         output_dir = QFileDialog.getExistingDirectory(self, "选择输出目录", self.output_dir)
@@ -349,50 +452,47 @@ class AutoVideoEditor(QMainWindow):
             self.update_buttons_state()
     
     def remove_selected(self):
-        selected_items = self.file_list.selectedItems()
-        if selected_items:
-            indices = [self.file_list.row(item) for item in selected_items]
-            # 从后往前删除避免索引变化
-            for index in sorted(indices, reverse=True):
-                del self.video_files[index]
-            self.update_file_list()
+        rows = [index.row() for index in self.file_list.selectionModel().selectedRows()]
+        if rows:
+            self.file_model.remove_rows(rows)
+            self.current_file_index = -1
+            self.load_preview()
+            self.update_buttons_state()
     
     def clear_files(self):
-        self.video_files = []
+        if self.scan_worker is not None and self.scan_worker.isRunning():
+            self.scan_worker.cancel()
+        self.file_model.clear()
         self.current_file_index = -1
-        self.update_file_list()
-    
-    def update_file_list(self):
-        self.file_list.clear()
-        for file_path in self.video_files:
-            item = QListWidgetItem(os.path.basename(file_path))
-            item.setData(Qt.UserRole, file_path)
-            self.file_list.addItem(item)
-        
+        self.thumbnails.cancel_pending()
+        self.load_preview()
         self.update_buttons_state()
     
     def update_buttons_state(self):
-        has_files = len(self.video_files) > 0
+        has_files = self.file_model.rowCount() > 0
         has_output_dir = self.output_dir and os.path.isdir(self.output_dir)
         
         self.process_current_btn.setEnabled(has_files and has_output_dir and self.current_file_index >= 0)
-        self.process_all_btn.setEnabled(has_files and has_output_dir)
+        # 批处理进行中不允许再次启动, 以免两批任务写入同一批输出和任务日志
+        batch_running = self.batch_worker is not None and self.batch_worker.isRunning()
+        self.process_all_btn.setEnabled(has_files and has_output_dir and not batch_running)
     
     def on_file_selected(self):
-        selected = self.file_list.selectedItems()
+        selected = self.file_list.selectionModel().selectedRows()
         if selected:
-            self.current_file_index = self.file_list.row(selected[0])
+            self.current_file_index = selected[0].row()
             self.load_preview()
             self.update_buttons_state()
     
     def load_preview(self):
-        if not self.video_files or self.current_file_index < 0:
+        self.preview_image = None
+        file_path = self.file_model.path_at(self.current_file_index)
+        if file_path is None:
+            self.preview_engine.stop_preview()
             self.preview_label.clear()
             self.file_info_label.setText("选择视频文件开始预览")
             return
         
-        file_path = self.video_files[self.current_file_index]
-        
         # 获取文件信息
         info = utils.get_video_info(file_path)
         if not info:
@@ -409,61 +509,95 @@ class AutoVideoEditor(QMainWindow):
 """
         self.file_info_label.setText(info_text)
         
-        # 获取并显示预览帧
-        frame = utils.get_frame_preview(file_path)
-        if frame is not None:
-            # 转换为Qt格式
-            h, w, ch = frame.shape
-            bytes_per_line = ch * w
-            q_img = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(q_img)
-            
-            # 调整预览大小
-            max_width = self.preview_label.width() - 20
-            max_height = 300
-            if pixmap.width() > max_width:
-                pixmap = pixmap.scaledToWidth(max_width, Qt.SmoothTransformation)
-            if pixmap.height() > max_height:
-                pixmap = pixmap.scaledToHeight(max_height, Qt.SmoothTransformation)
-            
-            self.preview_label.setPixmap(pixmap)
+        # 缩略图未就绪时由后台生成, 完成后在 on_thumbnail_ready 中显示
+        self.preview_image = self.thumbnails.get(file_path)
+        if self.preview_image is None:
+            self.preview_label.setText("正在生成预览...")
+        else:
+            self.show_preview_image()
+        self.refresh_live_preview()
     
-    def resizeEvent(self, event):
-        if self.current_file_index >= 0:
+    def connect_preview_signals(self):
+        """效果参数变化时刷新实时预览"""
+        # 不能直接连接 QTimer.start, 否则信号参数会被当作计时间隔(毫秒)
+        for check in (self.crop_check, self.filter_check, self.mirror_check, self.speed_check,
+                      self.shake_check, self.framedrop_check):
+            check.toggled.connect(lambda *_: self.preview_timer.start())
+        for spin in (self.crop_spin, self.speed_min_spin, self.speed_max_spin, self.seed_spin):
+            spin.valueChanged.connect(lambda *_: self.preview_timer.start())
+        self.speed_curve_combo.currentIndexChanged.connect(lambda *_: self.preview_timer.start())
+    
+    def refresh_live_preview(self):
+        """按当前配置重新渲染代理预览, 旧的渲染随即中止"""
+        file_path = self.file_model.path_at(self.current_file_index)
+        if self.live_preview_check.isChecked() and file_path is not None:
+            self.preview_engine.preview(file_path, self.get_current_config())
+        elif self.preview_engine.isRunning():
+            self.preview_engine.stop_preview()
+    
+    def on_preview_frame(self, generation, image):
+        # 丢弃已过期请求的帧
+        if generation != self.preview_engine.generation or not self.live_preview_check.isChecked():
+            return
+        self.preview_image = QPixmap.fromImage(image)
+        self.show_preview_image()
+    
+    def show_preview_image(self):
+        """按预览区域大小缩放当前预览图"""
+        if self.preview_image is None:
+            return
+        max_width = max(self.preview_label.width() - 20, 1)
+        max_height = 300
+        pixmap = self.preview_image
+        if pixmap.width() > max_width or pixmap.height() > max_height:
+            pixmap = pixmap.scaled(max_width, max_height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.preview_label.setPixmap(pixmap)
+    
+    def on_thumbnail_ready(self, file_path):
+        if self.live_preview_check.isChecked():
+            return
+        if self.file_model.path_at(self.current_file_index) == file_path:
             self.load_preview()
+    
+    def resizeEvent(self, event):
+        # 只重新缩放已缓存的缩略图, 不再重新解码视频
+        self.show_preview_image()
         super().resizeEvent(event)
     
+    def closeEvent(self, event):
+        """关闭前中止并等待所有后台线程, 避免线程运行中被销毁"""
+        for worker in (self.scan_worker, getattr(self, "worker", None), self.batch_worker):
+            if worker is not None and worker.isRunning():
+                # 窗口已关闭, 不再弹出完成提示
+                try:
+                    worker.finished.disconnect()
+                except TypeError:
+                    pass
+                worker.cancel()
+                worker.wait()
+        self.thumbnails.cancel_pending()
+        self.file_model.shutdown()
+        self.preview_engine.shutdown()
+        super().closeEvent(event)
+    
     def load_preset(self):
         """根据选择的预设方案设置处理选项"""
         preset = self.preset_combo.currentText()
         
-        # 重置所有选项
-        self.crop_check.setChecked(True)
-        self.filter_check.setChecked(True)
-        self.mirror_check.setChecked(False)
-        self.speed_check.setChecked(True)
-        self.shake_check.setChecked(False)
-        self.framedrop_check.setChecked(False)
-        self.crop_spin.setValue(15)
-        self.speed_min_spin.setValue(0.9)
-        self.speed_max_spin.setValue(1.1)
-        
-        # 设置不同预设的选项
-        if preset == "初级去重":
-            # 基础选项保持不变
-            pass
-        elif preset == "中级去重":
-            self.mirror_check.setChecked(True)
-            self.crop_spin.setValue(20)
-            self.speed_min_spin.setValue(0.8)
-            self.speed_max_spin.setValue(1.2)
-        elif preset == "高级去重":
-            self.mirror_check.setChecked(True)
-            self.shake_check.setChecked(True)
-            self.framedrop_check.setChecked(True)
-            self.crop_spin.setValue(25)
-            self.speed_min_spin.setValue(0.7)
-            self.speed_max_spin.setValue(1.3)
+        # 预设与命令行 --preset 共用同一份配置; "自定义"从默认配置开始
+        if preset in presets.PRESETS:
+            options = presets.preset_options(preset)
+        else:
+            options = presets.DEFAULT_OPTIONS
+        self.crop_check.setChecked(options["crop"])
+        self.filter_check.setChecked(options["filter"])
+        self.mirror_check.setChecked(options["mirror"])
+        self.speed_check.setChecked(options["speed"])
+        self.shake_check.setChecked(options["shake"])
+        self.framedrop_check.setChecked(options["framedrop"])
+        self.crop_spin.setValue(options["crop_percent"])
+        self.speed_min_spin.setValue(options["min_speed"])
+        self.speed_max_spin.setValue(options["max_speed"])
     
     def save_template(self):
         """保存当前设置为模板"""
@@ -496,32 +630,45 @@ class AutoVideoEditor(QMainWindow):
             "speed": self.speed_check.isChecked(),
             "min_speed": self.speed_min_spin.value(),
             "max_speed": self.speed_max_spin.value(),
+            "speed_curve": self.speed_curve_combo.currentData(),
+            "seed": self.seed_spin.value() or None,
             "shake": self.shake_check.isChecked(),
             "framedrop": self.framedrop_check.isChecked(),
+            "pipeline": self.pipeline_check.isChecked(),
+            # 界面不提供该项, 使用与命令行相同的默认值
+            "block_size": presets.DEFAULT_OPTIONS["block_size"],
             "combo_method": self.combo_combo.currentText(),
             "clip_duration": self.clip_duration_spin.value(),
-            "min_clips": self.min_clips_spin.value()
+            "min_clips": self.min_clips_spin.value(),
+            "encoder_preset": self.encoder_preset_combo.currentText(),
+            "crf": self.crf_spin.value(),
+            "output_profile": self.output_profile_combo.currentText(),
+            "workers": self.workers_spin.value()
         }
     
     def process_current(self):
         """处理当前选中的视频"""
-        if self.current_file_index < 0 or not self.video_files:
+        input_path = self.file_model.path_at(self.current_file_index)
+        if input_path is None:
             return
-        
-        input_path = self.video_files[self.current_file_index]
         config = self.get_current_config()
         
         # 生成输出文件名
         output_path = utils.generate_output_filename(
             input_path, self.output_dir, 
-            suffix=f"_{config['preset']}"
+            suffix=f"_{config['preset']}",
+            options=config
         )
         
         # 显示进度条
         self.progress_bar.setVisible(True)
+        self.progress_bar.setMaximum(100)
         self.progress_bar.setValue(0)
         
         # 异步处理视频
+        if self.video_processor is None:
+            from video_processor import VideoProcessor
+            self.video_processor = VideoProcessor()
         self.worker = VideoProcessorThread(
             self.video_processor, 
             input_path, 
@@ -534,78 +681,94 @@ class AutoVideoEditor(QMainWindow):
     
     def process_all(self):
         """批量处理所有视频"""
-        if not self.video_files:
+        video_files = self.file_model.paths()
+        if not video_files:
             return
         
         config = self.get_current_config()
-        total = len(self.video_files)
+        
+        # 生成输出文件名
+        jobs = [
+            (input_path, utils.generate_output_filename(
+                input_path, self.output_dir,
+                suffix=f"_{config['preset']}",
+                options=config
+            ))
+            for input_path in video_files
+        ]
         
         # 显示进度条
         self.progress_bar.setVisible(True)
-        self.progress_bar.setMaximum(total * 100)
+        self.progress_bar.setMaximum(100)
         self.progress_bar.setValue(0)
+        self.process_all_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
         
-        self.current_batch = 0
-        self.batch_results = []
-        self.process_next()
-    
-    def process_next(self):
-        """处理下一个视频"""
-        if self.current_batch >= len(self.video_files):
-            # 处理完成
-            self.progress_bar.setVisible(False)
-            success_count = sum(self.batch_results)
-            QMessageBox.information(
-                self, "处理完成", 
-                f"批量处理完成!\n成功: {success_count}, 失败: {len(self.batch_results) - success_count}"
-            )
-            return
-        
-        input_path = self.video_files[self.current_batch]
-        config = self.get_current_config()
-        
-        # 生成输出文件名
-        output_path = utils.generate_output_filename(
-            input_path, self.output_dir, 
-            suffix=f"_{config['preset']}"
+        # 多进程批量处理, 进度通过队列回传到界面线程;
+        # 任务日志保存在输出目录下, 中断后再次处理会跳过已完成的文件
+        self.batch_worker = BatchProcessorThread(
+            BatchProcessor(max_workers=config.get("workers")),
+            jobs,
+            config,
+            journal_path=default_journal_path(self.output_dir)
         )
+        self.batch_worker.progress.connect(self.on_batch_progress)
+        self.batch_worker.finished.connect(self.on_batch_finished)
+        self.batch_worker.start()
+    
+    def cancel_batch(self):
+        """取消正在进行的批量处理"""
+        if self.batch_worker is not None and self.batch_worker.isRunning():
+            self.batch_worker.cancel()
+            self.cancel_btn.setEnabled(False)
+    
+    def on_batch_progress(self, index, file_progress, overall_progress):
+        """批量处理进度回调"""
+        self.progress_bar.setValue(overall_progress)
+    
+    def on_batch_finished(self, results):
+        """批量处理完成回调"""
+        # 完成信号在 run() 返回前发出, 等线程真正结束后再恢复按钮
+        self.batch_worker.wait()
+        self.progress_bar.setVisible(False)
+        self.cancel_btn.setEnabled(False)
+        self.update_buttons_state()
         
-        # 处理视频
-        success = self.video_processor.process_video(
-            input_path, 
-            output_path, 
-            config, 
-            progress_callback=lambda p: self.update_progress(p, self.current_batch)
+        report = summarize(results, self.batch_worker.elapsed)
+        title = "处理已取消" if self.batch_worker.cancelled else "处理完成"
+        message = (
+            f"批量处理完成!\n成功: {report['succeeded']}(其中跳过已完成 {report['skipped']}), "
+            f"失败: {len(results) - report['succeeded']}"
         )
-        
-        self.batch_results.append(success)
-        self.current_batch += 1
-        self.update_progress(100, self.current_batch)
-        self.process_next()
+        if report["frames_out"]:
+            message += (
+                f"\n输出 {report['frames_out']} 帧, {report['bytes_written'] / 2 ** 20:.1f} MB, "
+                f"耗时 {report['elapsed']:.1f} 秒, 平均 {report['batch_fps']:.1f} 帧/秒"
+            )
+        if report["errors"]:
+            cause, count = max(report["errors"].items(), key=lambda item: item[1])
+            message += f"\n主要失败原因: {cause} ({count} 个)"
+        QMessageBox.information(self, title, message)
     
-    def update_progress(self, progress, batch_index=0):
+    def update_progress(self, progress):
         """更新进度条"""
-        if batch_index >= 0:
-            # 批量处理，计算总体进度
-            total = len(self.video_files)
-            batch_progress = int((batch_index * 100) + progress)
-            overall_progress = min(batch_progress, total * 100)
-            self.progress_bar.setValue(overall_progress)
-        else:
-            # 单文件处理
-            self.progress_bar.setValue(progress)
+        self.progress_bar.setValue(progress)
     
-    def on_process_finished(self, success):
+    def on_process_finished(self, result):
         """单个视频处理完成回调"""
         self.progress_bar.setVisible(False)
-        if success:
-            QMessageBox.information(self, "成功", "视频处理完成!")
+        if result:
+            QMessageBox.information(
+                self, "成功",
+                f"视频处理完成!\n输出 {result.frames_out} 帧, 耗时 {result.wall_seconds:.1f} 秒 "
+                f"({result.fps:.1f} 帧/秒)"
+            )
         else:
-            QMessageBox.warning(self, "错误", "视频处理失败!")
+            QMessageBox.warning(self, "错误", f"视频处理失败!\n{result.error or ''}")
 
 
 class VideoProcessorThread(QThread):
-    finished = pyqtSignal(bool)
+    finished = pyqtSignal(object)  # JobResult
     
     def __init__(self, processor, input_path, output_path, config, progress_callback):
         super().__init__()
@@ -614,19 +777,85 @@ class VideoProcessorThread(QThread):
         self.output_path = output_path
         self.config = config
         self.progress_callback = progress_callback
+        self._cancel_event = threading.Event()
+    
+    def cancel(self):
+        self._cancel_event.set()
     
     def run(self):
         try:
-            success = self.processor.process_video(
+            result = self.processor.process_video(
                 self.input_path,
                 self.output_path,
                 self.config,
-                progress_callback=self.progress_callback
+                progress_callback=self.progress_callback,
+                cancel_event=self._cancel_event
             )
-            self.finished.emit(success)
+            self.finished.emit(result)
         except Exception as e:
             print(f"处理失败: {str(e)}")
-            self.finished.emit(False)
+            self.finished.emit(JobResult([self.input_path], self.output_path).fail(str(e)).finish())
+
+
+class BatchProcessorThread(QThread):
+    progress = pyqtSignal(int, int, int)
+    finished = pyqtSignal(list)
+    
+    def __init__(self, batch_processor, jobs, config, journal_path=None):
+        super().__init__()
+        self.batch_processor = batch_processor
+        self.jobs = jobs
+        self.config = config
+        self.journal_path = journal_path
+        self.elapsed = None
+    
+    @property
+    def cancelled(self):
+        return self.batch_processor.cancelled
+    
+    def cancel(self):
+        self.batch_processor.cancel()
+    
+    def run(self):
+        journal = None
+        start_time = time.time()
+        try:
+            if self.journal_path:
+                journal = JobJournal(self.journal_path)
+            results = self.batch_processor.run(
+                self.jobs,
+                self.config,
+                progress_callback=lambda index, progress, overall: self.progress.emit(index, progress, int(overall)),
+                journal=journal
+            )
+        except Exception as e:
+            print(f"批量处理失败: {str(e)}")
+            results = [JobResult([input_path], output_path).fail(str(e)) for input_path, output_path in self.jobs]
+        finally:
+            if journal is not None:
+                journal.close()
+        self.elapsed = time.time() - start_time
+        self.finished.emit(results)
+
+
+class FolderScanThread(QThread):
+    batch_found = pyqtSignal(list)
+    finished = pyqtSignal(bool)
+    
+    def __init__(self, folder):
+        super().__init__()
+        self.folder = folder
+        self._cancel_event = threading.Event()
+    
+    def cancel(self):
+        self._cancel_event.set()
+    
+    def run(self):
+        for batch in iter_video_batches(self.folder, cancel_event=self._cancel_event):
+            if self._cancel_event.is_set():
+                break
+            self.batch_found.emit(batch)
+        self.finished.emit(not self._cancel_event.is_set())
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,142 @@
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal
+
+import utils
+import metadata_cache
+
+PATH_ROLE = Qt.UserRole
+INFO_ROLE = Qt.UserRole + 1
+
+
+class VideoListModel(QAbstractListModel):
+    """
+    视频文件列表模型
+    增删只通知变化的行, 重复检查用集合; 元信息在行首次显示时才后台读取
+    """
+    _info_loaded = pyqtSignal(str, object)
+
+    def __init__(self, parent=None, max_workers: int = 4):
+        super().__init__(parent)
+        self._paths: List[str] = []
+        self._keys = {}  # 路径 -> 真实路径, 用于去重
+        self._key_set = set()
+        self._info = {}
+        self._requested = {}  # 路径 -> 请求时的行号(行号可能已变化, 仅作提示)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._closed = False
+        self._info_loaded.connect(self._on_info_loaded)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._paths):
+            return None
+        path = self._paths[index.row()]
+
+        if role == Qt.DisplayRole:
+            info = self._info.get(path)
+            if info is None:
+                self._request_info(path, index.row())
+                return os.path.basename(path)
+            if not info:
+                return f"{os.path.basename(path)}  [无法读取]"
+            return (f"{os.path.basename(path)}  [{utils.format_duration(info['duration'])}"
+                    f"  {info['width']}×{info['height']}]")
+        if role == Qt.ToolTipRole or role == PATH_ROLE:
+            return path
+        if role == INFO_ROLE:
+            return self._info.get(path)
+        return None
+
+    def paths(self) -> List[str]:
+        return list(self._paths)
+
+    def path_at(self, row: int) -> Optional[str]:
+        if 0 <= row < len(self._paths):
+            return self._paths[row]
+        return None
+
+    def add_paths(self, paths: Iterable[str], keys: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        追加文件(按真实路径去重), 返回实际新增的路径
+        keys: 与 paths 一一对应的真实路径(如文件夹扫描时已算好), 未提供时逐个 realpath
+        """
+        paths = list(paths)
+        keys = [os.path.realpath(path) for path in paths] if keys is None else keys
+        added = []
+        for path, key in zip(paths, keys):
+            if key not in self._key_set:
+                self._key_set.add(key)
+                self._keys[path] = key
+                added.append(path)
+        if added:
+            first = len(self._paths)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            self._paths.extend(added)
+            self.endInsertRows()
+        return added
+
+    def remove_rows(self, rows: Iterable[int]):
+        """删除指定行, 连续的行合并为一次删除"""
+        rows = sorted(set(row for row in rows if 0 <= row < len(self._paths)), reverse=True)
+        # 降序排列时, 同一段连续行的 行号+位置 相同; 从后往前删除, 前面的行号不受影响
+        for _, run in itertools.groupby(enumerate(rows), key=lambda item: item[0] + item[1]):
+            run = [row for _, row in run]
+            last, first = run[0], run[-1]
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for path in self._paths[first:last + 1]:
+                self._key_set.discard(self._keys.pop(path))
+                self._info.pop(path, None)
+                self._requested.pop(path, None)
+            del self._paths[first:last + 1]
+            self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._paths = []
+        self._keys = {}
+        self._key_set = set()
+        self._info = {}
+        self._requested = {}
+        self.endResetModel()
+
+    def prefetch_info(self, paths: Iterable[str]):
+        """后台批量探测新加入文件的元信息, 之后显示、预览和处理时直接命中元信息缓存"""
+        paths = list(paths)
+        if paths and not self._closed:
+            self._executor.submit(metadata_cache.default_cache().probe_many, paths)
+
+    def shutdown(self):
+        """撤销尚未开始的元信息读取并停止线程池(关闭窗口时调用)"""
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _request_info(self, path: str, row: int):
+        if path in self._requested or self._closed:
+            return
+        self._requested[path] = row
+        future = self._executor.submit(metadata_cache.default_cache().get, path)
+        # 回调在工作线程中执行, 通过信号回到界面线程
+        future.add_done_callback(
+            lambda f, path=path: f.cancelled() or self._info_loaded.emit(
+                path, f.result() if not f.exception() else {}
+            )
+        )
+
+    def _on_info_loaded(self, path: str, info: dict):
+        if path not in self._requested:
+            # 请求发出后该行已被删除或列表已清空
+            return
+        row = self._requested.pop(path)
+        self._info[path] = info
+        if not (0 <= row < len(self._paths) and self._paths[row] == path):
+            if path not in self._paths:
+                return
+            row = self._paths.index(path)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, INFO_ROLE])
@@ -0,0 +1,69 @@
+import os
+import time
+from typing import Iterator, List, Optional, Set, Tuple
+
+import utils
+
+logger = utils.logger
+
+
+def iter_video_batches(root: str, batch_size: int = 200, max_delay: float = 0.5,
+                       cancel_event=None, seen: Optional[Set[str]] = None) -> Iterator[List[Tuple[str, str]]]:
+    """
+    基于 os.scandir 逐层扫描文件夹, 分批返回发现的视频文件 [(路径, 真实路径), ...]
+    每批最多 batch_size 个, 距上一批超过 max_delay 秒时也会提前返回, 便于界面及时刷新;
+    真实路径随路径一同返回, 调用方据此去重而无需再逐个 realpath;
+    提供 seen 时跳过其中已有的真实路径并把新的加入; 不跟随目录符号链接(与 os.walk 默认行为一致)
+    """
+    batch: List[Tuple[str, str]] = []
+    last_yield = time.monotonic()
+    stack = [root]
+
+    while stack:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+            # 每个目录只解析一次真实路径, 普通文件直接拼接, 避免逐个 realpath
+            real_directory = os.path.realpath(directory)
+        except OSError as e:
+            logger.error(f"无法读取目录 {directory}: {str(e)}")
+            continue
+
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(utils.VIDEO_EXTENSIONS) or not entry.is_file():
+                    continue
+                if entry.is_symlink():
+                    key = os.path.realpath(entry.path)
+                else:
+                    key = os.path.join(real_directory, entry.name)
+            except OSError:
+                continue
+            if seen is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            batch.append((entry.path, key))
+
+            if len(batch) >= batch_size or (time.monotonic() - last_yield) >= max_delay:
+                yield batch
+                batch = []
+                last_yield = time.monotonic()
+
+        # 逆序入栈, 保证按名称顺序深度优先遍历
+        stack.extend(reversed(subdirs))
+
+        if batch and (time.monotonic() - last_yield) >= max_delay:
+            yield batch
+            batch = []
+            last_yield = time.monotonic()
+
+    if batch:
+        yield batch
@@ -0,0 +1,64 @@
+import threading
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameRing:
+    """
+    固定数量的帧缓冲区轮转使用, 避免逐帧分配
+    缓冲区在被重新分配前最多可同时持有 size - 1 个, 调用方需保证在途帧数不超过该值
+    """
+
+    def __init__(self, size: int):
+        self.size = max(int(size), 2)
+        self._buffers = [None] * self.size
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """取出下一个缓冲区, 形状不符时重新分配"""
+        with self._lock:
+            index = self._next
+            self._next = (self._next + 1) % self.size
+            buffer = self._buffers[index]
+            if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+                buffer = self._buffers[index] = np.empty(shape, dtype=dtype)
+            return buffer
+
+
+_local = threading.local()
+
+
+def scratch_buffer(shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+    """当前线程的临时缓冲区, 仅在单次效果调用内使用"""
+    buffer = getattr(_local, "scratch", None)
+    if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+        buffer = _local.scratch = np.empty(shape, dtype=dtype)
+    return buffer
+
+
+def crop_scale_matrix(box: Sequence[int], frame_size: Tuple[int, int], mirror: bool = False) -> np.ndarray:
+    """
+    生成把裁剪区域缩放回原尺寸(可选水平镜像)的仿射矩阵
+    采样位置与 cv2.resize 的像素中心对齐方式一致
+    """
+    start_x, start_y, end_x, end_y = (int(v) for v in box)
+    width, height = frame_size
+    scale_x = width / max(end_x - start_x, 1)
+    scale_y = height / max(end_y - start_y, 1)
+    offset_x = scale_x * (0.5 - start_x) - 0.5
+    offset_y = scale_y * (0.5 - start_y) - 0.5
+    if mirror:
+        return np.float32([[-scale_x, 0, width - 1 - offset_x], [0, scale_y, offset_y]])
+    return np.float32([[scale_x, 0, offset_x], [0, scale_y, offset_y]])
+
+
+def crop_scale_mirror(frame: np.ndarray, box: Sequence[int], mirror: bool = False,
+                      dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """裁剪 + 缩放回原尺寸 + 镜像, 合并为一次 warpAffine 写入 dst"""
+    height, width = frame.shape[:2]
+    matrix = crop_scale_matrix(box, (width, height), mirror)
+    return cv2.warpAffine(frame, matrix, (width, height), dst=dst,
+                          flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
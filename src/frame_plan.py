@@ -0,0 +1,261 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+import instrumentation
+import utils
+
+# 每个源帧触发抽帧的概率
+FRAMEDROP_PROBABILITY = 0.05
+
+# 变速曲线与允许的速度范围
+SPEED_CURVES = ("constant", "ramp")
+MIN_SPEED = 0.25
+MAX_SPEED = 4.0
+
+# 每个输出帧应用各效果的概率
+FILTER_PROBABILITY = 0.7
+MIRROR_PROBABILITY = 0.3
+SHAKE_PROBABILITY = 0.1
+
+FILTER_TYPES = ("gaussian", "sepia", "contrast", "hsv_shift")
+SHAKE_MAX_OFFSET = 8
+
+
+def new_seed() -> int:
+    """生成新的随机种子"""
+    return int(np.random.SeedSequence().entropy % (2 ** 31))
+
+
+class EffectPlan:
+    """
+    整段视频的逐帧处理计划
+    所有数组按输出帧顺序排列, 长度与 source_frames 相同
+    """
+
+    def __init__(self, seed, source_frames: np.ndarray, crop_boxes: Optional[np.ndarray],
+                 filter_types: np.ndarray, hsv_shifts: np.ndarray,
+                 mirror: np.ndarray, shake_offsets: np.ndarray):
+        self.seed = seed
+        self.source_frames = source_frames
+        # (N, 4): start_x, start_y, end_x, end_y; 未启用裁剪时为 None
+        self.crop_boxes = crop_boxes
+        # FILTER_TYPES 中的下标, -1 表示该帧不加滤镜
+        self.filter_types = filter_types
+        # (N, 2): 色相偏移, 饱和度偏移
+        self.hsv_shifts = hsv_shifts
+        self.mirror = mirror
+        # (N, 2): 抖动平移量, 全 0 表示该帧不抖动
+        self.shake_offsets = shake_offsets
+        self.shake = np.any(shake_offsets != 0, axis=1)
+
+    def __len__(self):
+        return len(self.source_frames)
+
+    def effect_counts(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """前 limit 帧中各效果的应用次数, 滤镜按类型分别计数"""
+        end = len(self) if limit is None else min(limit, len(self))
+        counts = {}
+        if self.crop_boxes is not None and end:
+            counts["crop"] = end
+        filter_counts = np.bincount(self.filter_types[:end] + 1, minlength=len(FILTER_TYPES) + 1)
+        for name, count in zip(FILTER_TYPES, filter_counts[1:]):
+            if count:
+                counts[f"filter_{name}"] = int(count)
+        for name, flags in (("mirror", self.mirror), ("shake", self.shake)):
+            count = int(np.count_nonzero(flags[:end]))
+            if count:
+                counts[name] = count
+        return counts
+
+
+def speed_curve(total_frames: int, options: dict, rng: np.random.Generator) -> np.ndarray:
+    """
+    每个源帧的播放速度(>1 加速, <1 减速)
+    speed_curve="constant": 整段使用 [min_speed, max_speed] 内随机抽取的同一速度
+    speed_curve="ramp": 速度在 min_speed 与 max_speed 之间线性渐变, 渐快或渐慢随机
+    """
+    curve = options.get("speed_curve") or "constant"
+    if curve not in SPEED_CURVES:
+        raise ValueError(f"未知的变速曲线: {curve}")
+    low, high = sorted(
+        min(max(float(options.get(key, default)), MIN_SPEED), MAX_SPEED)
+        for key, default in (("min_speed", 0.9), ("max_speed", 1.1))
+    )
+    if curve == "ramp":
+        speeds = np.linspace(low, high, total_frames)
+        return speeds[::-1] if rng.random() < 0.5 else speeds
+    return np.full(total_frames, rng.uniform(low, high))
+
+
+def build_source_plan(total_frames: int, options: dict, rng: np.random.Generator,
+                      fps_ratio: float = 1.0) -> np.ndarray:
+    """
+    预先生成源帧读取计划
+    返回按输出顺序排列的源帧序号(单调不减), 未出现的帧将被丢弃, 重复的帧将被复用
+    fps_ratio: 输出帧率/源帧率
+
+    按时间重映射: 源帧 i 在输出时间轴上占 fps_ratio / speed[i] 个输出帧的时长,
+    第 k 个输出帧取覆盖输出时刻 k 的源帧。减速时同一源帧重复输出(读取时复用已解码的帧, 不回退),
+    加速或降帧率时跳过源帧, 输出时长 = 源时长 / 平均速度
+    """
+    total_frames = max(total_frames, 0)
+    if total_frames == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    speed = options.get("speed")
+    if speed or abs(fps_ratio - 1.0) > 1e-6:
+        rates = np.full(total_frames, fps_ratio)
+        if speed:
+            rates = fps_ratio / speed_curve(total_frames, options, rng)
+        # edges[i]: 源帧 i 在输出时间轴上的结束时刻
+        edges = np.cumsum(rates)
+        count = int(edges[-1] + 1e-6)
+        plan = np.searchsorted(edges, np.arange(count) + 1e-6, side="right")
+        plan = np.minimum(plan, total_frames - 1).astype(np.int64)
+    else:
+        plan = np.arange(total_frames, dtype=np.int64)
+
+    if options.get("framedrop"):
+        # 一次性抽取所有帧的随机事件, 循环只遍历触发事件的位置
+        drop_events = rng.random(total_frames) < FRAMEDROP_PROBABILITY
+        drop_lengths = rng.integers(1, 4, total_frames)
+        keep = np.ones(total_frames, dtype=bool)
+        next_free = 0
+        for index in np.flatnonzero(drop_events):
+            if index < next_free:
+                continue
+            next_free = index + drop_lengths[index]
+            keep[index:next_free] = False
+        # 被抽掉的源帧从计划中移除, 输出相应变短
+        plan = plan[keep[plan]]
+    return plan
+
+
+def time_scale(total_frames: int, plan_length: int, fps_ratio: float = 1.0) -> float:
+    """源时长 / 输出时长, 即音轨需要的变速倍数"""
+    if plan_length <= 0 or total_frames <= 0:
+        return 1.0
+    return total_frames * fps_ratio / plan_length
+
+
+def build_effect_plan(total_frames: int, frame_size: Tuple[int, int], options: dict,
+                      seed=None, fps_ratio: float = 1.0) -> EffectPlan:
+    """根据配置和随机种子一次性生成整段视频的处理计划"""
+    if seed is None:
+        seed = options.get("seed")
+    if seed is None:
+        seed = new_seed()
+    rng = np.random.default_rng(seed)
+
+    source_frames = build_source_plan(total_frames, options, rng, fps_ratio)
+    count = len(source_frames)
+    width, height = frame_size
+
+    crop_boxes = None
+    if options.get("crop"):
+        percent = options.get("crop_percent", 15)
+        crop_x = int(width * percent / 100)
+        crop_y = int(height * percent / 100)
+        crop_boxes = np.empty((count, 4), dtype=np.int32)
+        crop_boxes[:, 0] = rng.integers(0, crop_x + 1, count)
+        crop_boxes[:, 1] = rng.integers(0, crop_y + 1, count)
+        crop_boxes[:, 2] = width - rng.integers(0, crop_x + 1, count)
+        crop_boxes[:, 3] = height - rng.integers(0, crop_y + 1, count)
+
+    filter_types = np.full(count, -1, dtype=np.int8)
+    hsv_shifts = np.zeros((count, 2), dtype=np.int16)
+    if options.get("filter"):
+        enabled = rng.random(count) < FILTER_PROBABILITY
+        filter_type = options.get("filter_type", "random")
+        if filter_type in FILTER_TYPES:
+            choices = np.full(count, FILTER_TYPES.index(filter_type), dtype=np.int8)
+        else:
+            choices = rng.integers(0, len(FILTER_TYPES), count).astype(np.int8)
+        filter_types = np.where(enabled, choices, -1).astype(np.int8)
+        hsv_shifts[:, 0] = rng.integers(-10, 11, count)
+        hsv_shifts[:, 1] = rng.integers(-20, 21, count)
+
+    mirror = np.zeros(count, dtype=bool)
+    if options.get("mirror"):
+        mirror = rng.random(count) < MIRROR_PROBABILITY
+
+    shake_offsets = np.zeros((count, 2), dtype=np.int16)
+    if options.get("shake"):
+        enabled = rng.random(count) < SHAKE_PROBABILITY
+        offsets = rng.integers(-SHAKE_MAX_OFFSET, SHAKE_MAX_OFFSET + 1, (count, 2))
+        # 避免抽到 (0, 0) 导致计划中的抖动帧实际不动
+        offsets[(offsets == 0).all(axis=1), 0] = 1
+        shake_offsets[enabled] = offsets[enabled]
+
+    return EffectPlan(seed, source_frames, crop_boxes, filter_types, hsv_shifts, mirror, shake_offsets)
+
+
+def sample_segments(total_frames: int, clip_frames: int, count: int,
+                    rng: np.random.Generator) -> List[Tuple[int, int]]:
+    """
+    在 total_frames 帧中随机选取 count 个互不重叠、长度为 clip_frames 的片段, 按时间顺序返回
+    视频不够长时减少片段数, 至少返回一段
+    """
+    if total_frames <= 0:
+        return []
+    clip_frames = max(1, min(clip_frames, total_frames))
+    count = max(1, min(count, total_frames // clip_frames))
+    # 把剩余的空闲帧随机分配到各片段之前
+    slack = total_frames - count * clip_frames
+    offsets = np.sort(rng.integers(0, slack + 1, count))
+    starts = offsets + np.arange(count) * clip_frames
+    return [(int(start), int(start) + clip_frames) for start in starts]
+
+
+def iter_planned_frames(cap, plan: np.ndarray, cancel_event=None, ring=None, start: int = 0,
+                        stats=instrumentation.DISABLED, decode_size: Optional[Tuple[int, int]] = None):
+    """
+    按计划顺序读取视频, 除定位到 start 外不使用 seek
+    不需要的帧只 grab() 不解码, 重复的序号复用已解码的帧
+    ring: 可选的 FrameRing, 提供时直接解码到轮转缓冲区中
+    start: 计划中序号 0 对应的源帧, 读取前只定位一次
+    stats: 阶段耗时统计(seek / grab / decode / downscale)
+    decode_size: 指定时解码后立即缩小到该尺寸 (宽, 高), 后续处理都在缩小后的帧上进行
+    产出 (相对 start 的源帧序号, 帧)
+    """
+    if start > 0:
+        with stats.span("seek"):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    position = 0
+    frame = None
+    frame_position = -1
+    # 需要缩小时先解码到复用的全尺寸缓冲区, 缩小结果再写入轮转缓冲区
+    decoded = None
+    for target in plan:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+
+        target = int(target)
+        if target != frame_position:
+            # 顺序丢弃中间帧
+            while position < target:
+                with stats.span("grab"):
+                    grabbed = cap.grab()
+                if not grabbed:
+                    return
+                position += 1
+
+            with stats.span("decode"):
+                if decode_size is not None:
+                    ret, decoded = cap.read(decoded)
+                elif ring is not None and frame is not None:
+                    ret, frame = cap.read(ring.acquire(frame.shape))
+                else:
+                    ret, frame = cap.read()
+            if not ret:
+                return
+            if decode_size is not None:
+                with stats.span("downscale"):
+                    shape = (decode_size[1], decode_size[0], decoded.shape[2])
+                    frame = utils.downscale_frame(decoded, decode_size,
+                                                  dst=ring.acquire(shape) if ring is not None else None)
+            frame_position = position
+            position += 1
+
+        yield target, frame
@@ -0,0 +1,88 @@
+"""
+启动导入耗时分析
+
+通过命令行参数 --profile-imports 或环境变量 AVE_PROFILE_IMPORTS=1 开启,
+程序退出时把各模块首次导入的累计/自身耗时输出到 stderr。
+打包后的可执行文件无法使用 python -X importtime, 因此在应用内实现。
+"""
+import atexit
+import builtins
+import os
+import sys
+import time
+from typing import Dict, List
+
+PROFILE_FLAG = "--profile-imports"
+PROFILE_ENV = "AVE_PROFILE_IMPORTS"
+
+_original_import = None
+_records: Dict[str, List[float]] = {}
+_stack: List[float] = []
+_start_time = 0.0
+
+
+def requested(argv: List[str]) -> bool:
+    """检查是否要求开启导入分析, 并从参数列表中移除开关"""
+    enabled = os.environ.get(PROFILE_ENV) == "1"
+    if PROFILE_FLAG in argv:
+        argv.remove(PROFILE_FLAG)
+        enabled = True
+    return enabled
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # 只统计绝对导入的首次加载, 已加载的模块直接返回
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    start = time.perf_counter()
+    _stack.append(0.0)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        record = _records.setdefault(name, [0.0, 0.0])
+        record[0] += elapsed
+        record[1] += elapsed - children
+
+
+def enable(report_at_exit: bool = True):
+    """开始记录导入耗时"""
+    global _original_import, _start_time
+    if _original_import is not None:
+        return
+    _start_time = time.perf_counter()
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+    if report_at_exit:
+        atexit.register(report)
+
+
+def disable():
+    """停止记录导入耗时"""
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+
+
+def mark(label: str, stream=None):
+    """输出从开启分析到当前时刻的耗时, 用于标记启动阶段"""
+    if not _start_time:
+        return
+    stream = stream or sys.stderr
+    stream.write(f"[启动耗时] {label}: {(time.perf_counter() - _start_time) * 1000:.1f} ms\n")
+    stream.flush()
+
+
+def report(stream=None, limit: int = 30):
+    """按累计耗时输出最慢的模块"""
+    stream = stream or sys.stderr
+    rows = sorted(_records.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    stream.write(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块\n")
+    for name, (cumulative, self_time) in rows:
+        stream.write(f"{cumulative * 1000:10.1f} {self_time * 1000:10.1f}  {name}\n")
+    stream.flush()
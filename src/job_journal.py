@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+import utils
+import metadata_cache
+
+logger = utils.logger
+
+JOURNAL_FILENAME = ".autovideoeditor_jobs.sqlite"
+
+# 任务状态
+STATE_PENDING = "pending"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+
+def default_journal_path(output_dir: str) -> str:
+    """任务日志默认放在输出目录下, 同一输出目录的重复运行共享进度"""
+    return os.path.join(output_dir, JOURNAL_FILENAME)
+
+
+class JobJournal:
+    """
+    批处理任务日志
+    以 (输入真实路径, 配置指纹) 为键记录输出路径与状态, 中断后重新运行时跳过已完成的任务;
+    同时记录登记时输入文件的大小和修改时间, 原路径上的文件被修改或替换后不再视为已完成
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "input TEXT, template_hash TEXT, output TEXT, state TEXT, "
+            "attempts INTEGER DEFAULT 0, error TEXT, updated REAL, "
+            "PRIMARY KEY (input, template_hash))"
+        )
+        # 旧版本日志没有输入文件的大小/修改时间, 补充列后这些任务会重新处理一次
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column in ("input_size", "input_mtime_ns"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} INTEGER")
+        self._db.commit()
+
+    def is_done(self, input_path: str, template_hash: str, output_path: str) -> bool:
+        """任务已完成, 输入文件未变化且输出文件仍存在"""
+        signature = metadata_cache.file_signature(input_path)
+        if signature is None:
+            return False
+        real_path, size, mtime_ns = signature
+        with self._lock:
+            row = self._db.execute(
+                "SELECT output, state, input_size, input_mtime_ns FROM jobs WHERE input = ? AND template_hash = ?",
+                (real_path, template_hash)
+            ).fetchone()
+        if row is None or row[1] != STATE_DONE or (row[2], row[3]) != (size, mtime_ns):
+            return False
+        return row[0] == os.path.realpath(output_path) and os.path.isfile(row[0])
+
+    def mark(self, input_path: str, template_hash: str, output_path: str, state: str,
+             error: Optional[str] = None):
+        """记录任务状态, 完成或失败时累加尝试次数"""
+        self._write([(input_path, output_path)], template_hash, state, error)
+
+    def mark_pending(self, jobs: Iterable[Tuple[str, str]], template_hash: str):
+        """在同一事务中登记一批待处理任务"""
+        self._write(jobs, template_hash, STATE_PENDING)
+
+    def _write(self, jobs, template_hash: str, state: str, error: Optional[str] = None):
+        attempt = 0 if state == STATE_PENDING else 1
+        now = time.time()
+        rows = []
+        for input_path, output_path in jobs:
+            _, size, mtime_ns = metadata_cache.file_signature(input_path) or (None, None, None)
+            rows.append((os.path.realpath(input_path), template_hash, os.path.realpath(output_path),
+                         state, attempt, error, now, size, mtime_ns))
+        with self._lock:
+            try:
+                # 输入文件的大小/修改时间取登记为待处理时的值, 处理期间文件被修改时完成记录不会与之匹配
+                self._db.executemany(
+                    "INSERT INTO jobs (input, template_hash, output, state, attempts, error, updated, "
+                    "input_size, input_mtime_ns) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (input, template_hash) DO UPDATE SET "
+                    "output = excluded.output, state = excluded.state, error = excluded.error, "
+                    "attempts = attempts + excluded.attempts, updated = excluded.updated, "
+                    "input_size = CASE WHEN excluded.state = 'pending' OR input_size IS NULL "
+                    "THEN excluded.input_size ELSE input_size END, "
+                    "input_mtime_ns = CASE WHEN excluded.state = 'pending' OR input_mtime_ns IS NULL "
+                    "THEN excluded.input_mtime_ns ELSE input_mtime_ns END",
+                    rows
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"写入任务日志失败: {str(e)}")
+
+    def counts(self) -> dict:
+        """各状态的任务数"""
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
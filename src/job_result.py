@@ -0,0 +1,148 @@
+"""
+处理任务的结果与批次汇总
+
+JobResult 记录单个任务的输出、帧数、效果次数、耗时与失败原因, 布尔值等价于是否成功,
+原先按 True/False 判断返回值的调用方无需修改。summarize() 把一批结果汇总为可直接输出的字典。
+"""
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+class JobResult:
+    """单个处理任务(单视频处理或一次混剪)的结果"""
+
+    def __init__(self, input_paths: Iterable[str], output_path: str, seed=None):
+        self.input_paths: List[str] = list(input_paths)
+        self.output_path = output_path
+        self.seed = seed
+        self.success = False
+        self.cancelled = False
+        self.skipped = False      # 任务日志中已完成而跳过
+        self.cache_hit = False    # 直接取自结果缓存
+        self.error: Optional[str] = None
+        self.frames_in = 0        # 计划覆盖的源帧数
+        self.frames_out = 0       # 实际写出的帧数
+        self.frames_dropped = 0   # 被丢弃的源帧数
+        self.frames_repeated = 0  # 重复输出的帧数
+        self.effect_counts: Dict[str, int] = {}
+        self.wall_seconds = 0.0
+        self.bytes_written = 0
+        self.stats: Optional[dict] = None  # 开启 instrument 时的阶段耗时汇总
+        self._start = time.perf_counter()
+
+    def __bool__(self):
+        return self.success
+
+    def __repr__(self):
+        state = "ok" if self.success else ("cancelled" if self.cancelled else f"failed: {self.error}")
+        return f"JobResult({os.path.basename(self.output_path or '')}, {state}, frames_out={self.frames_out})"
+
+    @property
+    def fps(self) -> float:
+        """处理速度(写出帧数/耗时)"""
+        return self.frames_out / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def fail(self, error: str) -> "JobResult":
+        self.success = False
+        self.error = error
+        return self
+
+    def cancel(self) -> "JobResult":
+        self.success = False
+        self.cancelled = True
+        self.error = "已取消"
+        return self
+
+    def add_frames(self, plan, total_frames: int, written: int):
+        """累加一段处理计划的帧统计, written 为该段实际写出的帧数"""
+        # 主进程(批处理调度、命令行)也会导入本模块, 不依赖 numpy 以免拖慢启动
+        used = plan.source_frames[:written].tolist()
+        unique = sum(1 for previous, current in zip(used, used[1:]) if current != previous) + 1 if written else 0
+        if written >= len(plan):
+            frames_in = total_frames
+        else:
+            # 中途停止时只统计已读到的源帧
+            frames_in = int(used[-1]) + 1 if written else 0
+        self.frames_in += frames_in
+        self.frames_out += written
+        self.frames_dropped += max(frames_in - unique, 0)
+        self.frames_repeated += written - unique
+        for name, count in plan.effect_counts(written).items():
+            self.effect_counts[name] = self.effect_counts.get(name, 0) + count
+
+    def finish(self, stats: Optional[dict] = None) -> "JobResult":
+        """任务结束时记录耗时、输出大小与阶段统计"""
+        self.wall_seconds = time.perf_counter() - self._start
+        self.stats = stats
+        if self.success and self.output_path:
+            try:
+                self.bytes_written = os.path.getsize(self.output_path)
+            except OSError:
+                pass
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "inputs": self.input_paths,
+            "output": self.output_path,
+            "success": self.success,
+            "cancelled": self.cancelled,
+            "skipped": self.skipped,
+            "cache_hit": self.cache_hit,
+            "error": self.error,
+            "seed": self.seed,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "frames_dropped": self.frames_dropped,
+            "frames_repeated": self.frames_repeated,
+            "effect_counts": dict(self.effect_counts),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "fps": round(self.fps, 2),
+            "bytes_written": self.bytes_written,
+            "stats": self.stats,
+        }
+
+
+def summarize(results: Iterable[JobResult], elapsed: Optional[float] = None) -> dict:
+    """
+    汇总一批任务结果
+    elapsed: 整批的实际耗时, 提供时同时计算整批吞吐 batch_fps(多进程并行时高于单任务的 job_fps)
+    """
+    results = [result for result in results if result is not None]
+    processed = [result for result in results if not result.skipped and not result.cache_hit]
+    report = {
+        "jobs": len(results),
+        "succeeded": sum(1 for result in results if result.success),
+        "failed": sum(1 for result in results if not result.success and not result.cancelled),
+        "cancelled": sum(1 for result in results if result.cancelled),
+        "skipped": sum(1 for result in results if result.skipped),
+        "cache_hits": sum(1 for result in results if result.cache_hit),
+        "frames_in": sum(result.frames_in for result in processed),
+        "frames_out": sum(result.frames_out for result in processed),
+        "frames_dropped": sum(result.frames_dropped for result in processed),
+        "bytes_written": sum(result.bytes_written for result in processed),
+        "job_seconds": round(sum(result.wall_seconds for result in processed), 3),
+    }
+    report["job_fps"] = round(report["frames_out"] / report["job_seconds"], 2) if report["job_seconds"] else 0.0
+    if elapsed is not None:
+        report["elapsed"] = round(elapsed, 3)
+        report["batch_fps"] = round(report["frames_out"] / elapsed, 2) if elapsed > 0 else 0.0
+
+    effect_counts: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    stages: Dict[str, dict] = {}
+    for result in results:
+        for name, count in result.effect_counts.items():
+            effect_counts[name] = effect_counts.get(name, 0) + count
+        if result.error and not result.cancelled:
+            errors[result.error] = errors.get(result.error, 0) + 1
+        for name, stage in ((result.stats or {}).get("stages") or {}).items():
+            total = stages.setdefault(name, {"count": 0, "total_ms": 0.0})
+            total["count"] += stage["count"]
+            total["total_ms"] = round(total["total_ms"] + stage["total_ms"], 3)
+    report["effect_counts"] = effect_counts
+    report["errors"] = errors
+    if stages:
+        report["stages"] = dict(sorted(stages.items(), key=lambda item: -item[1]["total_ms"]))
+    return report
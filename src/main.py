@@ -1,9 +1,19 @@
 import sys
+import import_profiler
+
+# 需在导入界面模块之前开启, 才能统计到完整的启动导入耗时
+if import_profiler.requested(sys.argv):
+    import_profiler.enable()
+
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from editor_ui import AutoVideoEditor
 
 if __name__ == '__main__':
+    # 打包后的可执行文件需要支持多进程批处理
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = AutoVideoEditor()
     window.show()
+    import_profiler.mark("主窗口显示")
     sys.exit(app.exec_())
\ No newline at end of file
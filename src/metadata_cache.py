@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+import utils
+
+logger = utils.logger
+
+
+def file_signature(path: str) -> Optional[Tuple[str, int, int]]:
+    """返回 (真实路径, 文件大小, 修改时间ns), 文件不存在时返回 None"""
+    try:
+        real_path = os.path.realpath(path)
+        stat = os.stat(real_path)
+    except OSError:
+        return None
+    return real_path, stat.st_size, stat.st_mtime_ns
+
+
+class VideoInfoCache:
+    """
+    视频元信息缓存
+    内存中按 LRU 淘汰, 磁盘上用 SQLite 索引持久化; 以 路径+大小+修改时间 判断是否失效
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[Tuple[str, int, int], dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS video_info ("
+                    "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, info TEXT)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"打开元信息缓存失败: {str(e)}")
+                self._db = None
+
+    def get(self, path: str) -> dict:
+        """获取视频元信息, 未命中时探测并写入缓存"""
+        key = file_signature(path)
+        if key is None:
+            return {}
+
+        info = self._lookup(key)
+        if info is not None:
+            return dict(info)
+
+        info = utils.probe_video_info(path)
+        if info:
+            self._store(key, info)
+        return dict(info)
+
+    def probe_many(self, paths: Iterable[str], max_workers: Optional[int] = None) -> Dict[str, dict]:
+        """并行探测一批视频的元信息(已缓存的直接返回)"""
+        paths = list(paths)
+        if not paths:
+            return {}
+        workers = max_workers or min(8, (os.cpu_count() or 1) * 2)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(paths, executor.map(self.get, paths)))
+
+    def _lookup(self, key) -> Optional[dict]:
+        with self._lock:
+            info = self._memory.get(key)
+            if info is not None:
+                self._memory.move_to_end(key)
+                return info
+
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute(
+                    "SELECT info FROM video_info WHERE path = ? AND size = ? AND mtime_ns = ?", key
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"读取元信息缓存失败: {str(e)}")
+                return None
+            if row is None:
+                return None
+            info = json.loads(row[0])
+            self._remember(key, info)
+            return info
+
+    def _store(self, key, info: dict):
+        with self._lock:
+            self._remember(key, info)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO video_info (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                    (*key, json.dumps(info))
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"写入元信息缓存失败: {str(e)}")
+
+    def _remember(self, key, info: dict):
+        self._memory[key] = info
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+_default_cache = None
+_default_pid = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> VideoInfoCache:
+    """进程内共享的缓存实例, 磁盘索引位于缓存目录下"""
+    global _default_cache, _default_pid
+    with _default_lock:
+        # SQLite 连接不能跨进程使用, fork 出的子进程需重新打开
+        if _default_cache is None or _default_pid != os.getpid():
+            try:
+                db_path = os.path.join(utils.get_cache_dir(), "video_info.sqlite")
+            except OSError:
+                # 缓存目录不可写时仅使用内存缓存
+                db_path = None
+            _default_cache = VideoInfoCache(db_path)
+            _default_pid = os.getpid()
+        return _default_cache
@@ -0,0 +1,88 @@
+"""
+输出规格
+
+规格指定输出画布尺寸(宽高比不同时按 utils.resize_frame 补黑边)、帧率上限和码率。
+源视频大于目标尺寸时在解码后立即缩小, 效果处理与编码都在目标尺寸上进行,
+4K 源输出 1080p 时每帧的处理量降为约 1/4。
+
+任务配置:
+    output_profile  规格名称(见 PROFILES), 默认 "原始尺寸"
+    output_width / output_height / max_fps / video_bitrate  单独覆盖规格中的对应项
+"""
+from typing import Dict, Optional, Tuple
+
+DEFAULT_PROFILE = "原始尺寸"
+
+# 名称 -> (画布尺寸, 帧率上限, 码率); None 表示沿用源视频 / 编码器默认(CRF)
+PROFILES: Dict[str, Tuple[Optional[Tuple[int, int]], Optional[float], Optional[str]]] = {
+    DEFAULT_PROFILE: (None, None, None),
+    "竖屏 1080x1920": ((1080, 1920), 30.0, "8M"),
+    "竖屏 720x1280": ((720, 1280), 30.0, "4M"),
+    "横屏 1920x1080": ((1920, 1080), 30.0, "8M"),
+    "横屏 1280x720": ((1280, 720), 30.0, "4M"),
+    "方形 1080x1080": ((1080, 1080), 30.0, "6M"),
+}
+
+
+class OutputSpec:
+    """
+    按规格和源视频参数确定的输出参数
+    frame_size: 输出画布尺寸; decode_size: 解码后立即缩小到的尺寸, 不需要缩小时为 None
+    fps: 输出帧率; fps_ratio: 输出帧率/源帧率, 传给处理计划用于丢帧; bitrate: 目标码率
+    """
+
+    def __init__(self, frame_size: Tuple[int, int], decode_size: Optional[Tuple[int, int]],
+                 fps: float, fps_ratio: float, bitrate: Optional[str]):
+        self.frame_size = frame_size
+        self.decode_size = decode_size
+        self.fps = fps
+        self.fps_ratio = fps_ratio
+        self.bitrate = bitrate
+
+    def __repr__(self):
+        return (f"OutputSpec(frame_size={self.frame_size}, decode_size={self.decode_size}, "
+                f"fps={self.fps}, bitrate={self.bitrate})")
+
+
+def profile_settings(options: dict) -> Tuple[Optional[Tuple[int, int]], Optional[float], Optional[str]]:
+    """合并规格与单项覆盖, 返回 (画布尺寸, 帧率上限, 码率)"""
+    name = options.get("output_profile") or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"未知的输出规格: {name}")
+    size, max_fps, bitrate = PROFILES[name]
+    if options.get("output_width") and options.get("output_height"):
+        size = (int(options["output_width"]), int(options["output_height"]))
+    if options.get("max_fps"):
+        max_fps = float(options["max_fps"])
+    if options.get("video_bitrate"):
+        bitrate = str(options["video_bitrate"])
+    return size, max_fps, bitrate
+
+
+def fit_size(source_size: Tuple[int, int], target_size: Tuple[int, int]) -> Tuple[int, int]:
+    """等比缩放到目标尺寸以内后的尺寸, 与 utils.resize_frame 的计算一致"""
+    width, height = source_size
+    scale = min(target_size[0] / width, target_size[1] / height)
+    return int(width * scale), int(height * scale)
+
+
+def resolve(options: dict, source_size: Tuple[int, int], source_fps: float,
+            frame_size: Optional[Tuple[int, int]] = None, fps: Optional[float] = None) -> OutputSpec:
+    """
+    计算一个源视频的输出参数
+    frame_size / fps: 调用方已确定的画布尺寸与帧率(如混剪中取第一个视频), 规格中的设置优先
+    """
+    size, max_fps, bitrate = profile_settings(options)
+    frame_size = tuple(size or frame_size or source_size)
+    fps = fps or source_fps or 25.0
+    if max_fps and fps > max_fps:
+        fps = max_fps
+
+    decode_size = None
+    if frame_size != tuple(source_size):
+        content_size = fit_size(source_size, frame_size)
+        # 只在缩小时提前到解码后进行; 放大放到效果处理之后, 减少处理的像素
+        if content_size[0] < source_size[0]:
+            decode_size = content_size
+    fps_ratio = fps / source_fps if source_fps else 1.0
+    return OutputSpec(frame_size, decode_size, fps, fps_ratio, bitrate)
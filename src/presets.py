@@ -0,0 +1,39 @@
+"""
+默认处理配置与内置去重预设
+
+界面、命令行与基准测试共用, 不依赖 PyQt5 / OpenCV, 可在任何入口中直接导入。
+"""
+
+# 与界面"初级去重"一致的默认配置
+DEFAULT_OPTIONS = {
+    "preset": "初级去重",
+    "crop": True,
+    "crop_percent": 15,
+    "filter": True,
+    "mirror": False,
+    "speed": True,
+    "min_speed": 0.9,
+    "max_speed": 1.1,
+    "shake": False,
+    "framedrop": False,
+    "pipeline": True,
+    "block_size": 8,
+}
+
+# 预设名称 -> 在默认配置上覆盖的项
+PRESETS = {
+    "初级去重": {},
+    "中级去重": {"mirror": True, "crop_percent": 20, "min_speed": 0.8, "max_speed": 1.2},
+    "高级去重": {"mirror": True, "shake": True, "framedrop": True,
+                "crop_percent": 25, "min_speed": 0.7, "max_speed": 1.3},
+}
+
+
+def preset_options(name: str) -> dict:
+    """内置预设的完整配置"""
+    if name not in PRESETS:
+        raise ValueError(f"未知的预设: {name}")
+    options = dict(DEFAULT_OPTIONS)
+    options.update(PRESETS[name])
+    options["preset"] = name
+    return options
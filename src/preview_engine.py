@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtGui import QImage
+
+import utils
+
+# numpy / OpenCV / frame_plan 在后台线程首次渲染时才导入, 不拖慢界面启动
+cv2 = utils.lazy_import("cv2")
+
+# 代理帧宽度与预览时间窗口
+PROXY_WIDTH = 480
+WINDOW_SECONDS = 3.0
+# 预览窗口起点(占视频时长的比例), 避开片头
+WINDOW_START_RATIO = 0.1
+# 未设置随机种子时使用固定种子, 调整参数前后的预览可直接对比
+PREVIEW_SEED = 1
+MAX_PROXY_CLIPS = 4
+
+
+class PreviewEngine(QThread):
+    """
+    实时效果预览
+    解码一小段时间窗口并缩小为代理帧(按文件缓存), 在后台按当前配置渲染并按原帧率循环播放;
+    配置变化时立即中止旧的渲染
+    """
+    frame_ready = pyqtSignal(int, QImage)  # (请求序号, 帧)
+
+    def __init__(self, proxy_width: int = PROXY_WIDTH, window_seconds: float = WINDOW_SECONDS, parent=None):
+        super().__init__(parent)
+        self.proxy_width = proxy_width
+        self.window_seconds = window_seconds
+        self._condition = threading.Condition()
+        self._request = None
+        self._generation = 0
+        self._running = True
+        self._proxies: "OrderedDict[str, Tuple[numpy.ndarray, float]]" = OrderedDict()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def preview(self, video_path: str, options: dict) -> int:
+        """按新配置预览视频, 返回本次请求序号"""
+        with self._condition:
+            self._generation += 1
+            self._request = (self._generation, video_path, dict(options))
+            self._condition.notify_all()
+        if not self.isRunning():
+            self.start()
+        return self._generation
+
+    def stop_preview(self):
+        """停止播放(后台线程保持等待)"""
+        with self._condition:
+            self._generation += 1
+            self._request = None
+            self._condition.notify_all()
+
+    def shutdown(self):
+        """结束后台线程"""
+        with self._condition:
+            self._running = False
+            self._request = None
+            self._condition.notify_all()
+        self.wait()
+
+    def run(self):
+        processor = None
+        while True:
+            with self._condition:
+                while self._running and self._request is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                generation, video_path, options = self._request
+
+            if processor is None:
+                from video_processor import VideoProcessor
+                processor = VideoProcessor()
+            try:
+                self._play(processor, generation, video_path, options)
+            except Exception as e:
+                utils.logger.error(f"预览渲染失败: {str(e)}")
+
+            with self._condition:
+                if self._generation == generation:
+                    self._request = None
+
+    def _is_current(self, generation: int) -> bool:
+        return self._running and self._generation == generation
+
+    def _play(self, processor, generation: int, video_path: str, options: dict):
+        import frame_plan
+        proxy = self._proxy_frames(video_path)
+        if proxy is None:
+            return
+        frames, fps = proxy
+        height, width = frames.shape[1:3]
+
+        if options.get("seed") is None:
+            options["seed"] = PREVIEW_SEED
+        plan = frame_plan.build_effect_plan(len(frames), (width, height), options)
+        if len(plan) == 0:
+            return
+
+        # 第一遍边渲染边播放, 之后循环播放已渲染的帧
+        rendered = []
+        interval = 1.0 / fps
+        next_time = time.perf_counter()
+        while True:
+            for index in range(len(plan)):
+                if not self._is_current(generation):
+                    return
+                if index < len(rendered):
+                    image = rendered[index]
+                else:
+                    frame = processor.apply_planned_effects(frames[plan.source_frames[index]], plan, index)
+                    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    image = QImage(rgb.data, width, height, 3 * width, QImage.Format_RGB888).copy()
+                    rendered.append(image)
+                self.frame_ready.emit(generation, image)
+
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    # 等待期间收到新请求时立即返回
+                    with self._condition:
+                        self._condition.wait(delay)
+                else:
+                    next_time = time.perf_counter()
+
+    def _proxy_frames(self, video_path: str) -> Optional[Tuple["numpy.ndarray", float]]:
+        """取代理帧 (N, h, w, 3) 与帧率, 结果按文件缓存, 调整参数时无需重新解码"""
+        import numpy as np
+        proxy = self._proxies.get(video_path)
+        if proxy is not None:
+            self._proxies.move_to_end(video_path)
+            return proxy
+
+        info = utils.get_video_info(video_path)
+        if not info or not info["width"]:
+            return None
+        fps = info["fps"] or 25.0
+        count = max(1, int(self.window_seconds * fps))
+        start = max(0, min(int(info["frame_count"] * WINDOW_START_RATIO), info["frame_count"] - count))
+        proxy_width = min(self.proxy_width, info["width"])
+        proxy_height = max(2, int(round(info["height"] * proxy_width / info["width"] / 2)) * 2)
+
+        cap = cv2.VideoCapture(video_path)
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        frames = np.empty((count, proxy_height, proxy_width, 3), dtype=np.uint8)
+        read = 0
+        try:
+            while read < count:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                cv2.resize(frame, (proxy_width, proxy_height), dst=frames[read], interpolation=cv2.INTER_AREA)
+                read += 1
+        finally:
+            cap.release()
+        if read == 0:
+            return None
+
+        proxy = (frames[:read], fps)
+        self._proxies[video_path] = proxy
+        while len(self._proxies) > MAX_PROXY_CLIPS:
+            self._proxies.popitem(last=False)
+        return proxy
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import utils
+
+logger = utils.logger
+
+# 内容指纹取文件头、中、尾各一段, 避免读完整个视频
+SAMPLE_BYTES = 1024 * 1024
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+# 处理算法版本: 算法改变导致同一配置的输出不同时递增, 使旧的缓存结果失效
+RESULT_VERSION = 3
+
+
+def partial_hash(path: str, sample_bytes: int = SAMPLE_BYTES) -> str:
+    """按 文件大小 + 头/中/尾采样 计算快速内容指纹"""
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode("ascii"), digest_size=20)
+    with open(path, "rb") as f:
+        if size <= sample_bytes * 3:
+            digest.update(f.read())
+        else:
+            for offset in (0, size // 2 - sample_bytes // 2, size - sample_bytes):
+                f.seek(offset)
+                digest.update(f.read(sample_bytes))
+    return digest.hexdigest()
+
+
+def _copy_replace(source: str, target: str):
+    """
+    复制到目标旁的临时文件后原子替换
+    不使用硬链接: 缓存条目与输出文件共用 inode 时, 之后原地重写输出(如 ffmpeg -y)会连带改写缓存
+    """
+    temp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, target)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class ResultCache:
+    """
+    处理结果缓存
+    以 输入内容指纹 + 配置指纹(含随机种子) 为键保存输出文件, 总大小超出上限时按最近使用淘汰;
+    未指定随机种子时每次输出都不同, 不参与缓存
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), timeout=10,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, filename TEXT, size INTEGER, last_access REAL, hits INTEGER DEFAULT 0)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+        self._db.commit()
+
+    def key_for(self, input_path: str, options: dict) -> Optional[str]:
+        """计算缓存键, 无法缓存(未固定种子或文件不可读)时返回 None"""
+        if options.get("seed") is None:
+            return None
+        try:
+            content = partial_hash(input_path)
+        except OSError:
+            return None
+        key = f"{RESULT_VERSION}|{content}|{utils.options_fingerprint(options)}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def fetch(self, key: Optional[str], output_path: str) -> bool:
+        """命中时把缓存结果复制到 output_path"""
+        if key is None:
+            return False
+        with self._lock:
+            try:
+                row = self._db.execute("SELECT filename FROM results WHERE key = ?", (key,)).fetchone()
+                cached_path = os.path.join(self.cache_dir, row[0]) if row else None
+                if cached_path and os.path.isfile(cached_path):
+                    _copy_replace(cached_path, output_path)
+                    self._db.execute(
+                        "UPDATE results SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+                    )
+                    self._count("hits")
+                    return True
+                if row:
+                    # 缓存文件已被删除, 清理索引
+                    self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._count("misses")
+                return False
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"读取结果缓存失败: {str(e)}")
+                return False
+            finally:
+                self._commit()
+
+    def store(self, key: Optional[str], output_path: str):
+        """把处理完成的输出加入缓存, 并按容量上限淘汰"""
+        if key is None or not os.path.isfile(output_path):
+            return
+        filename = key + os.path.splitext(output_path)[1]
+        cached_path = os.path.join(self.cache_dir, filename)
+        with self._lock:
+            try:
+                _copy_replace(output_path, cached_path)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, filename, size, last_access, hits) VALUES (?, ?, ?, ?, 0)",
+                    (key, filename, os.path.getsize(cached_path), time.time())
+                )
+                self._evict()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"写入结果缓存失败: {str(e)}")
+            finally:
+                self._commit()
+
+    def stats(self) -> dict:
+        """命中/未命中次数及当前条目数、占用字节数"""
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM stats").fetchall())
+            entries, total_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "entries": entries,
+            "bytes": total_bytes,
+        }
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, filename, size FROM results ORDER BY last_access").fetchall()
+        for key, filename, size in rows:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+
+    def _count(self, name: str):
+        self._db.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + 1", (name,)
+        )
+
+    def _commit(self):
+        try:
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"写入结果缓存失败: {str(e)}")
+
+
+_default_cache = None
+_default_pid = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> Optional[ResultCache]:
+    """进程内共享的结果缓存, 缓存目录不可用时返回 None"""
+    global _default_cache, _default_pid
+    with _default_lock:
+        # SQLite 连接不能跨进程使用, 子进程需重新打开
+        if _default_pid != os.getpid():
+            try:
+                _default_cache = ResultCache(os.path.join(utils.get_cache_dir(), "results"))
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"打开结果缓存失败: {str(e)}")
+                _default_cache = None
+            _default_pid = os.getpid()
+        return _default_cache
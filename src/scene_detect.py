@@ -0,0 +1,235 @@
+"""
+镜头切分
+
+在缩小到 64x36 的灰度帧上计算相邻帧的 平均像素差 与 亮度直方图差, 分数超过阈值处视为镜头切换。
+优先由 ffmpeg 解码并缩放后经管道读取; keyframes_only 模式只解码关键帧, 速度可再提高一个数量级,
+切点精度为关键帧(编码器通常会在镜头切换处插入关键帧)。
+结果按 文件+参数 缓存在缓存目录下。
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import utils
+import metadata_cache
+import video_io
+
+logger = utils.logger
+cv2 = utils.lazy_import("cv2")
+
+ANALYSIS_SIZE = (64, 36)
+HISTOGRAM_BINS = 32
+DEFAULT_THRESHOLD = 0.3
+MIN_SHOT_SECONDS = 0.5
+CHUNK_FRAMES = 4096
+
+Shot = Tuple[int, int]  # (起始帧, 结束帧), 左闭右开
+
+_PTS_PATTERN = re.compile(r"pts_time:\s*(-?[\d.]+)")
+
+
+def frame_scores(frames: np.ndarray, previous: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    计算每帧与前一帧的差异分数(0-1)
+    frames: (N, H, W) uint8 灰度小图; previous 为上一批的最后一帧, 没有时首帧分数为 0
+    """
+    if previous is not None:
+        frames = np.concatenate([previous[None], frames])
+    count = len(frames)
+    if count < 2:
+        return np.zeros(len(frames) if previous is None else 0, dtype=np.float32)
+
+    pixels = frames.reshape(count, -1)
+    diff = np.abs(np.diff(pixels.astype(np.int16), axis=0)).mean(axis=1) / 255.0
+
+    # 所有帧的直方图一次 bincount 完成
+    bins = (pixels >> 3).astype(np.int64) + (np.arange(count, dtype=np.int64) * HISTOGRAM_BINS)[:, None]
+    hist = np.bincount(bins.ravel(), minlength=count * HISTOGRAM_BINS).reshape(count, HISTOGRAM_BINS)
+    hist = hist / pixels.shape[1]
+    hist_diff = np.abs(np.diff(hist, axis=0)).sum(axis=1) / 2.0
+
+    scores = ((diff + hist_diff) / 2.0).astype(np.float32)
+    if previous is None:
+        scores = np.concatenate([np.zeros(1, dtype=np.float32), scores])
+    return scores
+
+
+def find_cuts(scores: np.ndarray, threshold: float, min_gap: int,
+              indices: Optional[np.ndarray] = None) -> List[int]:
+    """
+    返回切点帧序号(新镜头的第一帧), 相邻切点至少间隔 min_gap 帧
+    indices: 各分数对应的源帧序号, 采样分析时提供
+    """
+    cuts = []
+    last = 0
+    for position in np.flatnonzero(scores > threshold):
+        frame = int(indices[position]) if indices is not None else int(position)
+        if frame - last >= min_gap:
+            cuts.append(frame)
+            last = frame
+    return cuts
+
+
+def cuts_to_shots(cuts: List[int], total_frames: int) -> List[Shot]:
+    bounds = [0] + [cut for cut in cuts if 0 < cut < total_frames] + [total_frames]
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _iter_ffmpeg_frames(path: str, keyframes_only: bool, positions: list, ffmpeg_path: str):
+    """经 ffmpeg 解码缩放, 分批产出灰度小图; 关键帧模式下 positions 依次追加各帧时间戳"""
+    width, height = ANALYSIS_SIZE
+    video_filter = f"scale={width}:{height}:flags=area"
+    if keyframes_only:
+        # showinfo 以 info 级别输出每帧时间戳
+        cmd = [ffmpeg_path, "-nostdin", "-v", "info", "-skip_frame", "nokey"]
+        video_filter += ",showinfo"
+    else:
+        cmd = [ffmpeg_path, "-nostdin", "-v", "error"]
+    cmd += ["-i", path, "-an", "-sn", "-dn", "-vf", video_filter, "-vsync", "passthrough",
+            "-pix_fmt", "gray", "-f", "rawvideo", "-"]
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    errors = []
+
+    def read_stderr():
+        # showinfo 的输出在 stderr, 需持续读取以免管道阻塞
+        for line in proc.stderr:
+            line = line.decode("utf-8", "replace")
+            match = _PTS_PATTERN.search(line) if keyframes_only else None
+            if match:
+                positions.append(float(match.group(1)))
+            elif "Error" in line or "error" in line:
+                errors.append(line.strip())
+
+    reader = threading.Thread(target=read_stderr, daemon=True)
+    reader.start()
+    frame_bytes = width * height
+    try:
+        while True:
+            data = proc.stdout.read(frame_bytes * CHUNK_FRAMES)
+            if not data:
+                break
+            count = len(data) // frame_bytes
+            yield np.frombuffer(data[:count * frame_bytes], dtype=np.uint8).reshape(count, height, width)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        reader.join()
+    if proc.returncode != 0 and errors:
+        raise IOError(f"ffmpeg 解码失败: {errors[-1]}")
+
+
+def _iter_opencv_frames(path: str, stride: int):
+    """无 ffmpeg 时用 OpenCV 逐帧解码, 每 stride 帧取一帧分析"""
+    cap = cv2.VideoCapture(path)
+    batch = []
+    index = 0
+    try:
+        while cap.grab():
+            if index % stride == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                small = cv2.resize(frame, ANALYSIS_SIZE, interpolation=cv2.INTER_AREA)
+                batch.append(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+                if len(batch) >= CHUNK_FRAMES:
+                    yield np.stack(batch)
+                    batch = []
+            index += 1
+    finally:
+        cap.release()
+    if batch:
+        yield np.stack(batch)
+
+
+def analyze(path: str, keyframes_only: bool = False, fps: float = 25.0):
+    """返回 (各分析帧对应的源帧序号, 差异分数)"""
+    ffmpeg_path = video_io.get_ffmpeg_exe()
+    positions: list = []
+    stride = 1
+    if ffmpeg_path:
+        chunks = _iter_ffmpeg_frames(path, keyframes_only, positions, ffmpeg_path)
+    else:
+        # 无法只解码关键帧时改为稀疏采样
+        stride = max(1, int(round(fps / 2))) if keyframes_only else 1
+        chunks = _iter_opencv_frames(path, stride)
+
+    parts = []
+    previous = None
+    analyzed = 0
+    for chunk in chunks:
+        parts.append(frame_scores(chunk, previous))
+        previous = chunk[-1]
+        analyzed += len(chunk)
+    scores = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    if ffmpeg_path and keyframes_only:
+        times = np.asarray(positions[:analyzed], dtype=np.float64)
+        if len(times) < len(scores):
+            scores = scores[:len(times)]
+        indices = np.round((times - (times[0] if len(times) else 0.0)) * fps).astype(np.int64)
+    else:
+        indices = np.arange(len(scores), dtype=np.int64) * stride
+    return indices, scores
+
+
+def _cache_path(path: str, params: str) -> Optional[str]:
+    signature = metadata_cache.file_signature(path)
+    if signature is None:
+        return None
+    try:
+        cache_dir = os.path.join(utils.get_cache_dir(), "shots")
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        return None
+    key = hashlib.sha1(f"{'|'.join(map(str, signature))}|{params}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def detect_shots(path: str, threshold: float = DEFAULT_THRESHOLD, keyframes_only: bool = False,
+                 min_shot_seconds: float = MIN_SHOT_SECONDS, use_cache: bool = True) -> List[Shot]:
+    """
+    把视频切分为镜头列表 [(起始帧, 结束帧), ...]
+    检测失败时把整段视频作为一个镜头返回
+    """
+    info = utils.get_video_info(path)
+    if not info:
+        return []
+    total_frames = info["frame_count"]
+    fps = info["fps"] or 25.0
+
+    cache_path = None
+    if use_cache:
+        cache_path = _cache_path(path, f"{threshold}|{keyframes_only}|{min_shot_seconds}")
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    return [tuple(shot) for shot in json.load(f)]
+            except (OSError, ValueError):
+                pass
+
+    try:
+        indices, scores = analyze(path, keyframes_only, fps)
+    except (IOError, OSError) as e:
+        logger.error(f"镜头检测失败 {path}: {str(e)}")
+        return [(0, total_frames)] if total_frames > 0 else []
+
+    min_gap = max(1, int(min_shot_seconds * fps))
+    if not keyframes_only and len(indices) and indices[-1] + 1 > total_frames:
+        # 容器记录的帧数可能不准, 以实际解码的帧数为准
+        total_frames = int(indices[-1]) + 1
+    shots = cuts_to_shots(find_cuts(scores, threshold, min_gap, indices), total_frames)
+
+    if cache_path:
+        try:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump(shots, f)
+        except OSError as e:
+            logger.error(f"写入镜头缓存失败: {str(e)}")
+    return shots
@@ -0,0 +1,182 @@
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+import utils
+import metadata_cache
+
+cv2 = utils.lazy_import("cv2")
+
+# 缩略图最大尺寸, 预览区域缩放时以此为源图
+THUMBNAIL_MAX_SIZE = (640, 360)
+THUMBNAIL_QUALITY = 85
+
+
+def thumbnail_key(video_path: str) -> Optional[str]:
+    """按 路径+大小+修改时间 生成缩略图文件名, 视频变化后自动失效"""
+    signature = metadata_cache.file_signature(video_path)
+    if signature is None:
+        return None
+    return hashlib.sha1("|".join(map(str, signature)).encode("utf-8")).hexdigest()
+
+
+class _ThumbnailSignals(QObject):
+    done = pyqtSignal(str, QImage)
+
+
+class _ThumbnailTask(QRunnable):
+    """
+    后台线程中解码首帧、缩放并写入磁盘缓存
+    任务开始时才从缓存的优先队列中取路径, 排队期间提高优先级的视频会先被处理
+    """
+
+    def __init__(self, take_next: Callable[[], Optional[Tuple[str, Optional[str]]]], signals: _ThumbnailSignals):
+        super().__init__()
+        self.take_next = take_next
+        self.signals = signals
+        self.setAutoDelete(True)
+
+    def run(self):
+        job = self.take_next()
+        if job is None:
+            return
+        self.video_path, self.thumbnail_path = job
+        image = QImage()
+        if self.thumbnail_path and os.path.exists(self.thumbnail_path):
+            image.load(self.thumbnail_path)
+
+        if image.isNull():
+            frame = utils.get_frame_preview(self.video_path)
+            if frame is not None:
+                frame = self._shrink(frame)
+                if self.thumbnail_path:
+                    cv2.imwrite(self.thumbnail_path, cv2.cvtColor(frame, cv2.COLOR_RGB2BGR),
+                                [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+                h, w, ch = frame.shape
+                image = QImage(frame.data, w, h, ch * w, QImage.Format_RGB888).copy()
+
+        self.signals.done.emit(self.video_path, image)
+
+    @staticmethod
+    def _shrink(frame):
+        h, w = frame.shape[:2]
+        max_w, max_h = THUMBNAIL_MAX_SIZE
+        scale = min(max_w / w, max_h / h, 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        return frame
+
+
+class ThumbnailCache(QObject):
+    """
+    预览缩略图缓存
+    后台线程池生成缩略图, 内存中保留有限数量的 QPixmap, 磁盘上保存 JPEG
+    """
+    thumbnail_ready = pyqtSignal(str)
+
+    def __init__(self, cache_dir: Optional[str] = None, max_items: int = 256,
+                 max_threads: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        self.max_items = max_items
+        self._pixmaps: "OrderedDict[str, QPixmap]" = OrderedDict()
+        # 排队中的视频: 堆中为 (-优先级, 序号, 路径), 提高优先级时追加新条目, 旧条目取出时跳过
+        self._lock = threading.Lock()
+        self._queue = []
+        self._queued = {}   # 路径 -> 当前优先级
+        self._counter = itertools.count()
+        self._running = set()
+
+        self.cache_dir = cache_dir
+        if self.cache_dir is None:
+            try:
+                self.cache_dir = os.path.join(utils.get_cache_dir(), "thumbnails")
+            except OSError:
+                self.cache_dir = None
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads or max(1, min(4, QThreadPool.globalInstance().maxThreadCount())))
+        self._signals = _ThumbnailSignals()
+        self._signals.done.connect(self._on_done)
+
+    def get(self, video_path: str) -> Optional[QPixmap]:
+        """取缩略图; 内存和磁盘均未命中时安排优先生成并返回 None"""
+        pixmap = self._pixmaps.get(video_path)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(video_path)
+            return pixmap
+
+        thumbnail_path = self._thumbnail_path(video_path)
+        if thumbnail_path and os.path.exists(thumbnail_path):
+            pixmap = QPixmap(thumbnail_path)
+            if not pixmap.isNull():
+                self._remember(video_path, pixmap)
+                return pixmap
+
+        self.request([video_path], priority=1)
+        return None
+
+    def request(self, video_paths: Iterable[str], priority: int = 0):
+        """安排后台生成缩略图; 已在内存或正在生成的跳过, 已在排队的按更高的优先级重新排序"""
+        for video_path in video_paths:
+            if video_path in self._pixmaps:
+                continue
+            with self._lock:
+                if video_path in self._running:
+                    continue
+                queued = self._queued.get(video_path)
+                if queued is not None and queued >= priority:
+                    continue
+                self._queued[video_path] = priority
+                heapq.heappush(self._queue, (-priority, next(self._counter), video_path))
+            if queued is None:
+                # 每个排队的视频对应一个任务, 提高优先级时不再新建
+                self._pool.start(_ThumbnailTask(self._take_next, self._signals))
+
+    def cancel_pending(self):
+        """撤销尚未开始的生成任务"""
+        self._pool.clear()
+        with self._lock:
+            self._queue.clear()
+            self._queued.clear()
+
+    def _take_next(self) -> Optional[Tuple[str, Optional[str]]]:
+        """在工作线程中取出优先级最高的视频"""
+        with self._lock:
+            while self._queue:
+                priority, _, video_path = heapq.heappop(self._queue)
+                if self._queued.get(video_path) == -priority:
+                    del self._queued[video_path]
+                    self._running.add(video_path)
+                    break
+            else:
+                return None
+        return video_path, self._thumbnail_path(video_path)
+
+    def _thumbnail_path(self, video_path: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        key = thumbnail_key(video_path)
+        return os.path.join(self.cache_dir, f"{key}.jpg") if key else None
+
+    def _on_done(self, video_path: str, image: QImage):
+        with self._lock:
+            self._running.discard(video_path)
+        if image.isNull():
+            return
+        self._remember(video_path, QPixmap.fromImage(image))
+        self.thumbnail_ready.emit(video_path)
+
+    def _remember(self, video_path: str, pixmap: QPixmap):
+        self._pixmaps[video_path] = pixmap
+        self._pixmaps.move_to_end(video_path)
+        while len(self._pixmaps) > self.max_items:
+            self._pixmaps.popitem(last=False)
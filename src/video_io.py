@@ -0,0 +1,158 @@
+import shutil
+import subprocess
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+import utils
+
+logger = utils.logger
+
+DEFAULT_BACKEND = "ffmpeg"
+DEFAULT_CODEC = "libx264"
+DEFAULT_PRESET = "fast"
+DEFAULT_CRF = 23
+
+
+def get_ffmpeg_exe() -> Optional[str]:
+    """查找 ffmpeg 可执行文件, 优先使用 imageio-ffmpeg 自带的版本"""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which("ffmpeg")
+
+
+def atempo_filter(tempo: float) -> str:
+    """音频变速滤镜; 单个 atempo 只支持 0.5-2.0 倍, 超出时串联多个"""
+    factors = []
+    while tempo < 0.5:
+        factors.append(0.5)
+        tempo /= 0.5
+    while tempo > 2.0:
+        factors.append(2.0)
+        tempo /= 2.0
+    factors.append(tempo)
+    return ",".join(f"atempo={factor:.6f}" for factor in factors)
+
+
+class OpenCVWriter:
+    """基于 cv2.VideoWriter 的输出后端(不含音频)"""
+
+    def __init__(self, output_path: str, fps: float, frame_size: Tuple[int, int], fourcc: str = "mp4v"):
+        self.output_path = output_path
+        self.frame_size = frame_size
+        self._writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, frame_size)
+
+    def isOpened(self) -> bool:
+        return self._writer.isOpened()
+
+    def write(self, frame):
+        self._writer.write(frame)
+
+    def release(self):
+        self._writer.release()
+
+
+class FFmpegWriter:
+    """
+    通过管道向 ffmpeg 子进程写入原始 BGR 帧
+    一次编码直接输出目标编码格式, 并可从源文件混入音轨
+    """
+
+    def __init__(self, output_path: str, fps: float, frame_size: Tuple[int, int],
+                 codec: str = DEFAULT_CODEC, preset: str = DEFAULT_PRESET,
+                 crf: int = DEFAULT_CRF, threads: int = 0, bitrate: Optional[str] = None,
+                 audio_source: Optional[str] = None, audio_codec: str = "aac",
+                 audio_tempo: float = 1.0, ffmpeg_path: Optional[str] = None):
+        self.output_path = output_path
+        self.frame_size = frame_size
+        width, height = frame_size
+
+        ffmpeg_path = ffmpeg_path or get_ffmpeg_exe()
+        if not ffmpeg_path:
+            raise RuntimeError("未找到 ffmpeg 可执行文件")
+
+        cmd = [
+            ffmpeg_path, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-vcodec", "rawvideo",
+            "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps}",
+            "-i", "-",
+        ]
+        if audio_source:
+            cmd += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?"]
+        cmd += ["-c:v", codec, "-preset", preset]
+        if bitrate:
+            # 指定码率时按平均码率编码, 峰值限制在同一码率附近
+            cmd += ["-b:v", bitrate, "-maxrate", bitrate, "-bufsize", bitrate]
+        else:
+            cmd += ["-crf", str(crf)]
+        cmd += [
+            "-threads", str(threads),
+            # yuv420p 要求宽高为偶数
+            "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+            "-pix_fmt", "yuv420p",
+        ]
+        if audio_source:
+            if abs(audio_tempo - 1.0) > 1e-3:
+                # 视频变速后音轨同步变速, 保持音画同步
+                cmd += ["-filter:a", atempo_filter(audio_tempo)]
+            cmd += ["-c:a", audio_codec, "-shortest"]
+        cmd.append(output_path)
+
+        self._proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+
+    def isOpened(self) -> bool:
+        return self._proc.poll() is None
+
+    def write(self, frame):
+        frame = np.ascontiguousarray(frame)
+        try:
+            self._proc.stdin.write(memoryview(frame))
+        except (BrokenPipeError, OSError):
+            raise IOError(f"ffmpeg 写入失败: {self._read_error()}")
+
+    def release(self):
+        if self._proc.stdin and not self._proc.stdin.closed:
+            try:
+                self._proc.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+        returncode = self._proc.wait()
+        if returncode != 0:
+            raise IOError(f"ffmpeg 编码失败({returncode}): {self._read_error()}")
+
+    def _read_error(self) -> str:
+        try:
+            return self._proc.stderr.read().decode("utf-8", errors="replace").strip()
+        except Exception:
+            return ""
+
+
+def create_writer(output_path: str, fps: float, frame_size: Tuple[int, int],
+                  options: dict, audio_source: Optional[str] = None, bitrate: Optional[str] = None,
+                  audio_tempo: float = 1.0):
+    """
+    根据配置创建输出后端
+    bitrate: 输出规格中的码率; audio_tempo: 音轨变速倍数(均仅 ffmpeg 后端支持)
+    """
+    backend = options.get("backend", DEFAULT_BACKEND)
+    if backend == "ffmpeg":
+        ffmpeg_path = get_ffmpeg_exe()
+        if ffmpeg_path:
+            return FFmpegWriter(
+                output_path, fps, frame_size,
+                codec=options.get("video_codec", DEFAULT_CODEC),
+                preset=options.get("encoder_preset", DEFAULT_PRESET),
+                crf=options.get("crf", DEFAULT_CRF),
+                threads=options.get("encoder_threads", 0),
+                bitrate=bitrate,
+                audio_source=audio_source,
+                audio_tempo=audio_tempo,
+                ffmpeg_path=ffmpeg_path
+            )
+        logger.warning("未找到 ffmpeg, 回退到 OpenCV 输出")
+    return OpenCVWriter(output_path, fps, frame_size)
@@ -1,28 +1,69 @@
 import cv2
 import numpy as np
 import random
-from moviepy.editor import VideoFileClip, concatenate_videoclips, ImageSequenceClip
 import os
 import time
-from tqdm import tqdm
-from . import utils
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import utils
+import video_io
+import frame_plan
+import block_effects
+import color_grading
+import frame_buffers
+import result_cache
+import scene_detect
+import instrumentation
+import output_profiles
+from job_result import JobResult
+
+# 界面中的合成方式名称与内部标识的对应关系
+COMBO_METHODS = {
+    "顺序合成": "sequential",
+    "随机合成": "random",
+    "混剪合成": "mix",
+    "场景重组": "scene_reorg",
+}
 
 class VideoProcessor:
     def __init__(self):
         self.temp_dir = "temp_frames"
+        # 当前任务的阶段耗时统计, 由任务配置 instrument / trace_path 开启
+        self.instrumentation = instrumentation.DISABLED
+        self.last_stats = None
     
-    def process_video(self, input_path, output_path, options, progress_callback=None):
+    def process_video(self, input_path, output_path, options, progress_callback=None, cancel_event=None):
         """
         处理单个视频文件
+        cancel_event: 可选的取消标志(threading/multiprocessing Event), 置位后中止处理
+        返回 JobResult, 布尔值为是否成功
         """
+        result = JobResult([input_path], output_path, options.get("seed"))
+        
         # 验证输出目录
         if not utils.validate_output_dir(os.path.dirname(output_path)):
-            return False
+            return result.fail("输出目录不可写").finish()
+        
+        stats = self.instrumentation = instrumentation.from_options(options)
+        self.last_stats = None
+        
+        # 相同内容+相同配置(固定种子)已处理过时直接取缓存结果, 不再重新编码
+        cache = result_cache.default_cache() if options.get("result_cache", True) else None
+        cache_key = cache.key_for(input_path, options) if cache else None
+        if cache_key and cache.fetch(cache_key, output_path):
+            stats.count("result_cache_hit")
+            self.finish_stats(os.path.basename(input_path), options)
+            print(f"命中结果缓存: {os.path.basename(input_path)}")
+            if progress_callback:
+                progress_callback(100)
+            result.success = result.cache_hit = True
+            return result.finish(self.last_stats)
         
         # 获取视频信息
         video_info = utils.get_video_info(input_path)
         if not video_info:
-            return False
+            return result.fail("无法读取视频信息").finish()
         
         # 创建临时目录
         os.makedirs(self.temp_dir, exist_ok=True)
@@ -33,204 +74,556 @@ class VideoProcessor:
             start_time = time.time()
             
             # 处理视频
-            frames = []
             cap = cv2.VideoCapture(input_path)
-            if not cap.isOpened():
-                return False
-            
-            width = video_info['width']
-            height = video_info['height']
-            fps = video_info['fps']
-            total_frames = video_info['frame_count']
-            
-            # 准备输出视频
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-            
-            # 应用所有选中的效果
-            frame_index = 0
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                processed_frame = frame.copy()
+            try:
+                if not cap.isOpened():
+                    return result.fail("无法打开视频")
                 
-                # 应用去重效果
-                if options.get("crop"):
-                    processed_frame = self.apply_crop(processed_frame, options.get("crop_percent", 15))
+                width = video_info['width']
+                height = video_info['height']
+                fps = video_info['fps']
+                total_frames = video_info['frame_count']
                 
-                if options.get("filter") and random.random() < 0.7:
-                    processed_frame = self.apply_filter(processed_frame, options.get("filter_type", "random"))
+                # 输出规格: 大于目标尺寸的源在解码后立即缩小, 效果与编码都在目标尺寸上进行
+                spec = output_profiles.resolve(options, (width, height), fps)
                 
-                if options.get("mirror") and random.random() < 0.3:
-                    processed_frame = self.apply_mirror(processed_frame)
-                
-                if options.get("speed") and random.random() < 0.3:
-                    frame_index = self.apply_speed_effect(cap, frame_index, total_frames, options)
-                    continue
-                
-                if options.get("shake") and random.random() < 0.1:
-                    processed_frame = self.apply_shake(processed_frame)
-                
-                if options.get("framedrop") and random.random() < 0.05:
-                    frame_index += random.randint(1, 3)
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-                    continue
-                
-                # 写入处理后的帧
-                out.write(processed_frame)
-                frame_index += 1
+                # 预先生成逐帧处理计划, 再按计划顺序读取并应用效果
+                plan = frame_plan.build_effect_plan(
+                    total_frames, spec.decode_size or (width, height), options, fps_ratio=spec.fps_ratio
+                )
+                result.seed = plan.seed
                 
-                # 更新进度
-                if progress_callback:
-                    progress = int((frame_index / total_frames) * 100)
-                    progress_callback(progress)
+                # 准备输出视频(默认经 ffmpeg 管道一次编码并保留原音轨, 变速时音轨按相同倍数变速)
+                out = video_io.create_writer(
+                    output_path, spec.fps, spec.frame_size, options,
+                    audio_source=input_path, bitrate=spec.bitrate,
+                    audio_tempo=frame_plan.time_scale(total_frames, len(plan), spec.fps_ratio)
+                )
+                try:
+                    frames = frame_plan.iter_planned_frames(
+                        cap, plan.source_frames, cancel_event,
+                        ring=frame_buffers.FrameRing(self.frames_in_flight(options) + 1),
+                        stats=stats, decode_size=spec.decode_size
+                    )
+                    written = self.write_frames(frames, out, plan, options, total_frames, progress_callback,
+                                                output_size=spec.frame_size)
+                    result.add_frames(plan, total_frames, written)
+                    # 写完所有帧后才到达的取消不影响结果; 中途取消时删除截断的输出, 以免被当作成品
+                    if written < len(plan) and cancel_event is not None and cancel_event.is_set():
+                        self.discard_output(out, output_path)
+                        print(f"视频处理已取消: {os.path.basename(input_path)}")
+                        return result.cancel()
+                except BaseException:
+                    # 出错时同样关闭编码器, 避免 ffmpeg 子进程泄漏, 并删除写了一半的输出
+                    self.discard_output(out, output_path)
+                    raise
+                with stats.span("encode_flush"):
+                    out.release()
+            finally:
+                cap.release()
             
-            # 释放资源
-            cap.release()
-            out.release()
+            if written == 0:
+                return result.fail("没有写出任何帧")
+            
+            if cache_key:
+                cache.store(cache_key, output_path)
             
             # 处理时长
             duration = time.time() - start_time
             print(f"视频处理完成 - 时长: {duration:.2f}秒")
-            return True
+            result.success = True
+            return result
         
         except Exception as e:
             print(f"处理视频时出错: {str(e)}")
-            return False
+            return result.fail(f"{type(e).__name__}: {str(e)}")
         finally:
             # 清理临时文件
             utils.cleanup_temp_files(self.temp_dir)
+            self.finish_stats(os.path.basename(input_path), options)
+            result.finish(self.last_stats)
+    
+    def discard_output(self, out, output_path):
+        """处理出错时关闭输出并删除不完整的文件; 关闭时的错误不再覆盖原始异常"""
+        try:
+            out.release()
+        except Exception:
+            pass
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+    
+    def finish_stats(self, label, options):
+        """任务结束时输出阶段统计: 汇总保存在 last_stats 并写入日志, 指定 trace_path 时按任务导出时间线"""
+        stats = self.instrumentation
+        if not stats.enabled or self.last_stats is not None:
+            return
+        self.last_stats = stats.summary()
+        stats.log_summary(label)
+        if options.get("trace_path"):
+            stats.write_chrome_trace(instrumentation.trace_file_path(options["trace_path"], label))
+    
+    def apply_planned_effects(self, frame, plan, index, dst=None):
+        """
+        按处理计划对第 index 个输出帧应用效果
+        结果写入 dst(未提供时新分配); 该帧无任何效果时直接返回原帧, 不做复制
+        """
+        crop = plan.crop_boxes is not None
+        mirror = plan.mirror[index]
+        filter_index = plan.filter_types[index]
+        shake = plan.shake[index]
+        if not (crop or mirror or shake or filter_index >= 0):
+            return frame
+        
+        if dst is None:
+            dst = np.empty_like(frame)
+        source = frame
+        stats = self.instrumentation
+        
+        # 裁剪、缩放与镜像合并为一次几何变换
+        if crop:
+            with stats.span("crop"):
+                frame_buffers.crop_scale_mirror(source, plan.crop_boxes[index], mirror, dst=dst)
+            source = dst
+        elif mirror:
+            with stats.span("mirror"):
+                self.apply_mirror(source, dst=dst)
+            source = dst
+        
+        if filter_index >= 0:
+            filter_type = frame_plan.FILTER_TYPES[filter_index]
+            with stats.span(f"filter_{filter_type}"):
+                self.apply_filter(source, filter_type, hsv_shift=plan.hsv_shifts[index], dst=dst)
+            source = dst
+        
+        if shake:
+            with stats.span("shake"):
+                if source is dst:
+                    # warpAffine 不能原地处理
+                    source = frame_buffers.scratch_buffer(dst.shape)
+                    np.copyto(source, dst)
+                self.apply_shake(source, offset=plan.shake_offsets[index], dst=dst)
+        
+        return dst
+    
+    def apply_planned_effects_block(self, block, plan, start, out=None, buffers=None):
+        """
+        按处理计划对一组连续输出帧 (N, H, W, 3) 批量应用效果
+        start 为块内第一帧在计划中的序号, 同类效果对块内所有命中帧一次处理
+        """
+        end = start + len(block)
+        buffers = buffers or block_effects.BlockBuffers()
+        stats = self.instrumentation
+        
+        # 几何变换与逐帧路径一致: 裁剪、缩放与镜像合并为一次 warpAffine
+        mirror = plan.mirror[start:end]
+        if plan.crop_boxes is not None:
+            with stats.span("crop"):
+                out = block_effects.crop_resize_block(block, plan.crop_boxes[start:end], out, mirror)
+        else:
+            with stats.span("mirror"):
+                out = block_effects.ensure_buffer(out, block.shape)
+                np.copyto(out, block)
+                if mirror.any():
+                    out[mirror] = out[mirror][:, :, ::-1]
+        
+        filter_types = plan.filter_types[start:end]
+        for filter_index, filter_type in enumerate(frame_plan.FILTER_TYPES):
+            hits = np.flatnonzero(filter_types == filter_index)
+            if hits.size == 0:
+                continue
+            with stats.span(f"filter_{filter_type}"):
+                if hits.size == len(out):
+                    block_effects.apply_filter_block(
+                        out, filter_type, plan.hsv_shifts[start:end], out=out, buffers=buffers
+                    )
+                else:
+                    out[hits] = block_effects.apply_filter_block(
+                        out[hits], filter_type, plan.hsv_shifts[start:end][hits], buffers=buffers
+                    )
+        
+        for i in np.flatnonzero(plan.shake[start:end]):
+            with stats.span("shake"):
+                out[i] = self.apply_shake(out[i], offset=plan.shake_offsets[start + i])
+        
+        return out
+    
+    def write_frames(self, frames, out, plan, options, total_frames, progress_callback=None, output_size=None):
+        """
+        按处理计划对帧流应用效果并写入输出, 按配置选择串行或流水线模式
+        options["block_size"] 大于 1 时按帧块批量处理
+        output_size: 指定时将处理后的帧等比缩放到该尺寸
+        返回实际写出的帧数
+        """
+        stats = self.instrumentation
+        
+        def fit(processed_frame):
+            if output_size and processed_frame.shape[1::-1] != tuple(output_size):
+                with stats.span("resize"):
+                    processed_frame = utils.resize_frame(processed_frame, output_size)
+            return processed_frame
+        
+        written = [0]
+        
+        def encode(processed_frame):
+            with stats.span("encode"):
+                out.write(processed_frame)
+            written[0] += 1
+        
+        block_size = options.get("block_size", 1)
+        pipeline = options.get("pipeline")
+        
+        if block_size > 1:
+            items = block_effects.iter_blocks(frames, block_size)
+            # 串行模式下输出缓冲区可跨块复用; 流水线中多个块同时在途, 每块单独分配
+            shared = None if pipeline else (block_effects.BlockBuffers(), [None])
+            
+            def transform(index, block):
+                if shared is None:
+                    return self.apply_planned_effects_block(block, plan, index * block_size)
+                buffers, result = shared
+                result[0] = self.apply_planned_effects_block(
+                    block, plan, index * block_size, out=result[0], buffers=buffers
+                )
+                return result[0]
+            
+            def write(processed_block):
+                for processed_frame in processed_block:
+                    encode(fit(processed_frame))
+        else:
+            items = frames
+            # 输出帧写入轮转缓冲区, 缓冲区数量覆盖所有在途帧
+            ring = frame_buffers.FrameRing(self.frames_in_flight(options) + 1)
+            transform = lambda index, frame: fit(
+                self.apply_planned_effects(frame, plan, index, dst=ring.acquire(frame.shape))
+            )
+            write = encode
+        
+        if pipeline:
+            self.run_pipeline(items, transform, write, options, total_frames, progress_callback)
+            return written[0]
+        
+        for index, (frame_index, item) in enumerate(items):
+            # 写入处理后的帧
+            write(transform(index, item))
+            
+            # 更新进度
+            if progress_callback:
+                progress = int(((frame_index + 1) / total_frames) * 100)
+                progress_callback(progress)
+        return written[0]
     
-    def process_multiple_videos(self, video_paths, output_path, options):
+    def pipeline_settings(self, options):
+        """流水线的效果线程数与队列长度"""
+        workers = options.get("pipeline_workers") or min(4, os.cpu_count() or 1)
+        queue_size = options.get("pipeline_queue_size") or workers * 2
+        return workers, queue_size
+    
+    def frames_in_flight(self, options):
+        """同时被持有的最大帧数, 用于确定轮转缓冲区数量"""
+        block_size = options.get("block_size", 1)
+        # 打包帧块时, 尚未凑满一块的帧同样被持有
+        pending = block_size if block_size > 1 else 0
+        if not options.get("pipeline"):
+            return 2 + pending
+        workers, queue_size = self.pipeline_settings(options)
+        return queue_size + workers + 2 + pending
+    
+    def run_pipeline(self, items, transform, write, options, total_frames, progress_callback=None):
+        """
+        流水线模式: 读取线程 -> 效果线程池 -> 写入线程
+        items 产出 (源帧序号, 帧或帧块), 经 transform 处理后由 write 写出
+        各阶段通过有界队列连接, 写入按帧序进行, 在途帧数固定
+        """
+        workers, queue_size = self.pipeline_settings(options)
+        pending = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        errors = []
+        stats = self.instrumentation
+        
+        def put(item):
+            # 下游异常退出时不再阻塞
+            start = time.perf_counter()
+            while not stop.is_set():
+                try:
+                    pending.put(item, timeout=0.1)
+                    stats.record("queue_put_wait", start, time.perf_counter())
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def reader():
+            try:
+                for index, (frame_index, item) in enumerate(items):
+                    if stop.is_set():
+                        break
+                    future = executor.submit(transform, index, item)
+                    if not put((frame_index, future)):
+                        break
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(None)
+        
+        def writer():
+            try:
+                waiting_since = time.perf_counter()
+                while True:
+                    try:
+                        item = pending.get(timeout=0.1)
+                    except queue.Empty:
+                        if stop.is_set():
+                            break
+                        continue
+                    stats.record("queue_get_wait", waiting_since, time.perf_counter())
+                    if item is None:
+                        break
+                    frame_index, future = item
+                    with stats.span("effect_wait"):
+                        result = future.result()
+                    write(result)
+                    
+                    if progress_callback:
+                        progress = int(((frame_index + 1) / total_frames) * 100)
+                        progress_callback(progress)
+                    waiting_since = time.perf_counter()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            threads = [
+                threading.Thread(target=reader, name="pipeline-reader", daemon=True),
+                threading.Thread(target=writer, name="pipeline-writer", daemon=True),
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        if errors:
+            raise errors[0]
+    
+    def process_multiple_videos(self, video_paths, output_path, options, progress_callback=None, cancel_event=None):
         """
         处理多个视频进行混剪
+        各源视频处理后的帧按合成顺序直接写入同一个编码器, 不产生中间文件
+        输出尺寸取第一个可用视频, 其余视频等比缩放并补黑边; 输出不含音轨
+        返回 JobResult, 布尔值为是否成功
         """
+        result = JobResult(video_paths or [], output_path, options.get("seed"))
         try:
             if not video_paths:
-                return False
+                return result.fail("没有输入视频")
                 
             # 验证输出目录
             if not utils.validate_output_dir(os.path.dirname(output_path)):
-                return False
-                
-            # 创建临时目录
-            os.makedirs(self.temp_dir, exist_ok=True)
+                return result.fail("输出目录不可写")
             
             # 开始混剪处理
             start_time = time.time()
-            clips = []
+            stats = self.instrumentation = instrumentation.from_options(options)
+            self.last_stats = None
             
-            # 处理每个视频片段
-            for idx, path in enumerate(video_paths):
+            sources = []
+            for path in video_paths:
                 if not os.path.exists(path):
                     continue
+                info = utils.get_video_info(path)
+                if info:
+                    sources.append((path, info))
+            
+            if not sources:
+                return result.fail("没有可读取的输入视频")
+            
+            # 合成顺序与各源视频的处理计划均由同一随机种子派生
+            seed = options.get("seed")
+            if seed is None:
+                seed = frame_plan.new_seed()
+            result.seed = seed
+            segments = self.plan_segments(sources, options, seed)
+            if not segments:
+                return result.fail("没有可用的片段")
+            
+            # 未指定输出规格时, 输出尺寸取第一个片段的源视频
+            first = segments[0][1]
+            spec = output_profiles.resolve(options, (first['width'], first['height']), first['fps'],
+                                           fps=options.get("mix_fps", 30))
+            output_fps = spec.fps
+            output_size = spec.frame_size
+            out = video_io.create_writer(output_path, output_fps, output_size, options, bitrate=spec.bitrate)
+            
+            written = 0
+            interrupted = False
+            try:
+                # 依次处理每个片段并直接写入输出
+                for idx, (path, info, start, end) in enumerate(segments):
+                    if cancel_event is not None and cancel_event.is_set():
+                        interrupted = True
+                        break
                     
-                print(f"处理视频 {idx+1}/{len(video_paths)}: {os.path.basename(path)}")
-                
-                # 处理单个视频
-                temp_output = os.path.join(self.temp_dir, f"temp_{idx}.mp4")
-                success = self.process_video(path, temp_output, options)
-                
-                if success:
-                    clip = VideoFileClip(temp_output)
-                    clips.append(clip)
-            
-            # 合成视频
-            if clips:
-                if options.get("combo_method") == "random":
-                    random.shuffle(clips)
-                    final_clip = concatenate_videoclips(clips, method="compose")
-                elif options.get("combo_method") == "scene_reorg":
-                    # 场景重组逻辑（简化版）
-                    final_clip = self.scene_reorganization(clips)
-                else:  # 默认顺序合成
-                    final_clip = concatenate_videoclips(clips, method="compose")
-                
-                # 设置输出参数
-                final_clip.write_videofile(
-                    output_path,
-                    codec='libx264',
-                    audio_codec='aac',
-                    fps=30,
-                    threads=4,
-                    preset='fast'
-                )
-                
-                duration = time.time() - start_time
-                print(f"混剪完成 - 总时长: {duration:.2f}秒")
-                return True
-            return False
+                    print(f"处理片段 {idx+1}/{len(segments)}: {os.path.basename(path)} [{start}-{end})")
+                    
+                    cap = cv2.VideoCapture(path)
+                    if not cap.isOpened():
+                        continue
+                    
+                    total_frames = end - start
+                    source_size = (info['width'], info['height'])
+                    source_spec = output_profiles.resolve(options, source_size, info['fps'],
+                                                          frame_size=output_size, fps=output_fps)
+                    plan = frame_plan.build_effect_plan(
+                        total_frames, source_spec.decode_size or source_size, options,
+                        seed=[seed, idx], fps_ratio=source_spec.fps_ratio
+                    )
+                    frames = frame_plan.iter_planned_frames(
+                        cap, plan.source_frames, cancel_event,
+                        ring=frame_buffers.FrameRing(self.frames_in_flight(options) + 1),
+                        start=start, stats=stats, decode_size=source_spec.decode_size
+                    )
+                    
+                    source_progress = None
+                    if progress_callback:
+                        source_progress = lambda p, idx=idx: progress_callback(
+                            int((idx * 100 + min(p, 100)) / len(segments))
+                        )
+                    
+                    try:
+                        count = self.write_frames(frames, out, plan, options, total_frames,
+                                                  source_progress, output_size)
+                        result.add_frames(plan, total_frames, count)
+                        if count:
+                            written += 1
+                        if count < len(plan) and cancel_event is not None and cancel_event.is_set():
+                            interrupted = True
+                            break
+                    finally:
+                        cap.release()
+            finally:
+                with stats.span("encode_flush"):
+                    out.release()
+            
+            if interrupted:
+                # 中途取消时删除截断的输出
+                self.discard_output(out, output_path)
+                print("混剪已取消")
+                return result.cancel()
+            if written == 0:
+                return result.fail("没有写出任何帧")
+            
+            duration = time.time() - start_time
+            print(f"混剪完成 - 总时长: {duration:.2f}秒")
+            result.success = True
+            return result
             
         except Exception as e:
             print(f"混剪视频时出错: {str(e)}")
-            return False
+            return result.fail(f"{type(e).__name__}: {str(e)}")
         finally:
-            # 清理临时文件
-            utils.cleanup_temp_files(self.temp_dir)
+            self.finish_stats(os.path.basename(output_path), options)
+            result.finish(self.last_stats)
+    
+    def order_sources(self, sources, options, seed=None):
+        """按合成方式确定源视频顺序"""
+        combo_method = COMBO_METHODS.get(options.get("combo_method"), options.get("combo_method"))
+        sources = list(sources)
+        if combo_method == "random":
+            order = np.random.default_rng(seed).permutation(len(sources))
+            sources = [sources[i] for i in order]
+        return sources
+    
+    def plan_segments(self, sources, options, seed=None):
+        """
+        确定混剪片段 [(路径, 信息, 起始帧, 结束帧), ...]
+        混剪合成: 每个源视频随机截取 min_clips 段不超过 clip_duration 秒的片段, 打乱后拼接
+        场景重组: 把所有源视频切分为镜头(超过 clip_duration 的截短)后打乱重排
+        其他方式按源视频顺序整段使用
+        只解码选中的片段, 每段定位一次
+        """
+        combo_method = COMBO_METHODS.get(options.get("combo_method"), options.get("combo_method"))
+        if combo_method not in ("mix", "scene_reorg"):
+            return [(path, info, 0, info['frame_count']) for path, info in self.order_sources(sources, options, seed)]
+        
+        rng = np.random.default_rng(seed)
+        clip_duration = options.get("clip_duration", 5)
+        segments = []
+        for path, info in sources:
+            clip_frames = max(1, int(round(clip_duration * (info['fps'] or 25.0))))
+            if combo_method == "mix":
+                ranges = frame_plan.sample_segments(
+                    info['frame_count'], clip_frames, options.get("min_clips", 3), rng
+                )
+            else:
+                shots = scene_detect.detect_shots(
+                    path,
+                    threshold=options.get("scene_threshold", scene_detect.DEFAULT_THRESHOLD),
+                    keyframes_only=options.get("scene_keyframes_only", False)
+                )
+                ranges = [(start, min(end, start + clip_frames)) for start, end in shots]
+            segments.extend((path, info, start, end) for start, end in ranges)
+        order = rng.permutation(len(segments))
+        return [segments[i] for i in order]
     
     # 下面是各种效果处理方法
-    def apply_crop(self, frame, percent=15):
-        """随机裁剪视频内容"""
+    def apply_crop(self, frame, percent=15, box=None, dst=None):
+        """随机裁剪视频内容, box 为 (start_x, start_y, end_x, end_y) 时使用指定裁剪区域"""
         height, width = frame.shape[:2]
-        crop_x = int(width * percent / 100)
-        crop_y = int(height * percent / 100)
         
-        # 随机选择裁剪位置
-        start_x = random.randint(0, crop_x)
-        start_y = random.randint(0, crop_y)
-        end_x = width - random.randint(0, crop_x)
-        end_y = height - random.randint(0, crop_y)
+        if box is None:
+            crop_x = int(width * percent / 100)
+            crop_y = int(height * percent / 100)
+            
+            # 随机选择裁剪位置
+            start_x = random.randint(0, crop_x)
+            start_y = random.randint(0, crop_y)
+            end_x = width - random.randint(0, crop_x)
+            end_y = height - random.randint(0, crop_y)
+        else:
+            start_x, start_y, end_x, end_y = box
         
         cropped_frame = frame[start_y:end_y, start_x:end_x]
         
         # 将裁剪后的帧调整回原始尺寸
-        return cv2.resize(cropped_frame, (width, height))
+        return cv2.resize(cropped_frame, (width, height), dst=dst)
     
-    def apply_filter(self, frame, filter_type="random"):
-        """应用随机滤镜效果"""
+    def apply_filter(self, frame, filter_type="random", hsv_shift=None, dst=None):
+        """应用随机滤镜效果, hsv_shift 为 (色相偏移, 饱和度偏移) 时使用指定偏移量"""
         if filter_type == "random":
-            filter_type = random.choice(["gaussian", "sepia", "contrast", "hsv_shift"])
+            filter_type = random.choice(frame_plan.FILTER_TYPES)
             
         if filter_type == "gaussian":
-            return cv2.GaussianBlur(frame, (5, 5), 0)
+            return cv2.GaussianBlur(frame, (5, 5), 0, dst=dst)
         elif filter_type == "sepia":
             # 应用棕褐色滤镜
-            sepia_filter = np.array([[0.272, 0.534, 0.131],
-                                     [0.349, 0.686, 0.168],
-                                     [0.393, 0.769, 0.189]])
-            return cv2.transform(frame, sepia_filter)
+            return color_grading.apply_sepia(frame, dst=dst)
         elif filter_type == "contrast":
-            # 增加对比度
-            lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            cl = clahe.apply(l)
-            limg = cv2.merge((cl, a, b))
-            return cv2.cvtColor(limg, cv2.COLOR_LAB2BGR)
+            # 增加对比度(复用缓存的 CLAHE 实例)
+            return color_grading.apply_contrast(frame, dst=dst)
         elif filter_type == "hsv_shift":
-            # 随机HSV偏移
-            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            hsv[:,:,0] = (hsv[:,:,0] + random.randint(-10, 10)) % 180
-            hsv[:,:,1] = np.clip(hsv[:,:,1] + random.randint(-20, 20), 0, 255)
-            return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+            # 随机HSV偏移(查表实现)
+            if hsv_shift is None:
+                hsv_shift = (random.randint(-10, 10), random.randint(-20, 20))
+            return color_grading.apply_hsv_shift(frame, hsv_shift[0], hsv_shift[1], dst=dst)
         else:
-            return frame
+            if dst is None or dst is frame:
+                return frame
+            np.copyto(dst, frame)
+            return dst
     
-    def apply_mirror(self, frame):
+    def apply_mirror(self, frame, dst=None):
         """水平镜像效果"""
-        return cv2.flip(frame, 1)
+        return cv2.flip(frame, 1, dst=dst)
     
-    def apply_speed_effect(self, cap, current_frame, total_frames, options):
-        """随机跳过帧实现变速效果"""
-        min_speed = options.get("min_speed", 0.9)
-        max_speed = options.get("max_speed", 1.1)
-        
-        # 随机决定跳过多少帧
-        skip_frames = random.randint(0, int(min_speed * 10)) if min_speed < 1.0 else 0
-        skip_frames += random.randint(0, int(max_speed * 10) - 10) if max_speed > 1.0 else 0
-        
-        new_frame = current_frame + skip_frames
-        
-        if new_frame < total_frames
\ No newline at end of file
+    def apply_shake(self, frame, max_offset=frame_plan.SHAKE_MAX_OFFSET, offset=None, dst=None):
+        """随机平移画面模拟抖动效果, offset 为 (dx, dy) 时使用指定平移量"""
+        height, width = frame.shape[:2]
+        if offset is None:
+            dx = random.randint(-max_offset, max_offset)
+            dy = random.randint(-max_offset, max_offset)
+        else:
+            dx, dy = int(offset[0]), int(offset[1])
+        matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+        return cv2.warpAffine(frame, matrix, (width, height), dst=dst, borderMode=cv2.BORDER_REFLECT)